@@ -0,0 +1,235 @@
+"""Benchmark of building a synthetic site.
+
+Usage:
+    bench_build.py [options]
+
+Options:
+    -o --output=FILE    Save the results as JSON to FILE.
+    --repeat=N          Repeat in-process measurements N times and take the
+                        fastest [default: 3].
+    --watch-edits=N     Number of edits for measuring the watch mode latency,
+                        0 to skip it [default: 5].
+    --jobs=N            Render pages in N parallel processes [default: 1].
+    --posts=N           Number of posts [default: 1000].
+    --tags=N            Number of tags per post [default: 3].
+    --tag-count=N       Number of distinct tags [default: 50].
+    --layout-depth=N    Depth of the layout inheritance chain [default: 3].
+    --includes=N        Number of includes used by the post layout [default: 5].
+    --static-files=N    Number of static files [default: 200].
+    --static-size=KB    Mean size of static files [default: 64].
+    --seed=N            Random seed [default: 1].
+
+Measures the time of load_site(), process_posts, generate_pages and
+generate_files in a clean build, of a whole clean build, of a rebuild
+without changes, of a rebuild after editing one post, and of the latency
+between editing a post and getting it rebuilt by `obraz serve --watch`.
+The peak RSS of a clean build is measured in a separate process.
+
+Compare the results of two runs with benchmarks/compare.py.
+"""
+
+import json
+import os
+import platform
+import resource
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+from time import perf_counter, sleep
+from typing import cast
+
+from docopt import docopt
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import obraz  # noqa: E402
+import synthetic  # noqa: E402
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+RUN_OBRAZ = "import sys, obraz; sys.argv[0] = 'obraz'; obraz.main()"
+
+
+def obraz_command(*args):
+    return [sys.executable, "-c", RUN_OBRAZ] + list(args)
+
+
+def obraz_env():
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.path.abspath(ROOT)
+    return env
+
+
+def build(source, jobs, *args):
+    argv = ["build", "-q", "-s", source, "-d", os.path.join(source, "_site")]
+    obraz.obraz(argv + ["--jobs", str(jobs)] + list(args))
+
+
+def timed(f, *args):
+    t0 = perf_counter()
+    f(*args)
+    return perf_counter() - t0
+
+
+def edit_post(source, n):
+    posts = os.path.join(source, "_posts")
+    path = os.path.join(posts, sorted(os.listdir(posts))[0])
+    marker = f"Edited {n}"
+    with open(path, "a") as fd:
+        fd.write(f"\n{marker}\n")
+    return marker
+
+
+def output_of_first_post(source):
+    config = cast(obraz.Config, obraz.DEFAULT_CONFIG.copy())
+    config["source"] = source
+    config["destination"] = os.path.join(source, "_site")
+    site = obraz.load_site(config)
+    obraz.process_posts(site)
+    url = site["posts"][-1]["url"]
+    return os.path.join(source, "_site", obraz.url2path(url))
+
+
+def bench_phases(source, jobs, repeat):
+    """Time the build phases of clean builds using the profiler."""
+    names = {
+        "process_posts": obraz.object_name(obraz.process_posts),
+        "generate_pages": obraz.object_name(obraz.generate_pages),
+        "generate_files": obraz.object_name(obraz.generate_files),
+    }
+    best: dict[str, float] = {}
+    for _ in range(repeat):
+        shutil.rmtree(os.path.join(source, "_site"), ignore_errors=True)
+        shutil.rmtree(os.path.join(source, obraz.CACHE_DIR), ignore_errors=True)
+        profile = os.path.join(source, "_profile.json")
+        total = timed(build, source, jobs, "--profile-output", profile)
+        with open(profile) as fd:
+            summary = {t["name"]: t["total"] for t in json.load(fd)["summary"]}
+        os.remove(profile)
+        results = {key: summary.get(name, 0.0) for key, name in names.items()}
+        results["load_site"] = summary.get("Loading source files", 0.0)
+        results["build"] = total
+        for key, value in results.items():
+            best[key] = min(best.get(key, value), value)
+    return best
+
+
+def bench_rebuilds(source, jobs, repeat):
+    results = {}
+    build(source, jobs)
+    results["noop_rebuild"] = min(timed(build, source, jobs) for _ in range(repeat))
+    times = []
+    for i in range(repeat):
+        edit_post(source, i)
+        times.append(timed(build, source, jobs))
+    results["incremental_rebuild"] = min(times)
+    return results
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return str(s.getsockname()[1])
+
+
+def wait_for(predicate, timeout=300.0):
+    t0 = perf_counter()
+    while not predicate():
+        if perf_counter() - t0 > timeout:
+            raise Exception("Timed out waiting for the watch mode rebuild")
+        sleep(0.005)
+
+
+def contains(path, text):
+    try:
+        with open(path) as fd:
+            return text in fd.read()
+    except OSError:
+        return False
+
+
+def bench_watch(source, edits):
+    """Measure the median time from editing a post to its rebuilt output."""
+    output = output_of_first_post(source)
+    cmd = obraz_command("serve", "-w", "-q", "-s", source, "-P", free_port())
+    cmd += ["-d", os.path.join(source, "_site")]
+    process = subprocess.Popen(cmd, env=obraz_env(), stderr=subprocess.DEVNULL)
+    try:
+        marker = edit_post(source, "watch-start")
+        wait_for(lambda: contains(output, marker))
+        sleep(0.5)
+        times = []
+        for i in range(edits):
+            marker = edit_post(source, f"watch-{i}")
+            t0 = perf_counter()
+            wait_for(lambda: contains(output, marker))
+            times.append(perf_counter() - t0)
+            sleep(0.2)
+    finally:
+        process.terminate()
+        process.wait()
+    times.sort()
+    return times[len(times) // 2]
+
+
+def peak_rss_kb(source, jobs):
+    """Build the site from scratch in a separate process, return its peak RSS."""
+    destination = os.path.join(source, "_site.rss")
+    cmd = obraz_command("build", "-q", "-s", source, "-d", destination)
+    cmd += ["--clean", "--jobs", str(jobs)]
+    subprocess.check_call(cmd, env=obraz_env())
+    shutil.rmtree(destination)
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    scale = 1024 if sys.platform == "darwin" else 1
+    return usage.ru_maxrss // scale
+
+
+def format_result(key, value):
+    return f"{value} KB" if key.endswith("_kb") else f"{value:.3f} s"
+
+
+def git_commit():
+    try:
+        output = subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT, stderr=subprocess.DEVNULL
+        )
+        return output.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    opts = docopt(__doc__, argv=sys.argv[1:])
+    repeat = int(opts["--repeat"])
+    jobs = int(opts["--jobs"])
+    edits = int(opts["--watch-edits"])
+    tempdir = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    try:
+        source = os.path.join(tempdir, "site")
+        params = synthetic.make_site(source, **synthetic.options_params(opts))
+        results = {"peak_rss_kb": peak_rss_kb(source, jobs)}
+        results.update(bench_phases(source, jobs, repeat))
+        results.update(bench_rebuilds(source, jobs, repeat))
+        if edits > 0:
+            results["watch_latency"] = bench_watch(source, edits)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(tempdir)
+    data = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": dict(params, jobs=jobs, repeat=repeat),
+        "results": results,
+    }
+    for key, value in results.items():
+        print(f"{key:>20}: {format_result(key, value)}")
+    if opts["--output"]:
+        with open(opts["--output"], "w") as fd:
+            json.dump(data, fd, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Benchmark of classifying source paths by the built-in loaders.
+
+Usage:
+    python benchmarks/bench_classifier.py [COUNT]
+
+Compares the precompiled path classifier with the per-loader checks that
+called re.match() with uncompiled exclude patterns for every path part.
+"""
+
+import os
+import re
+import sys
+from time import perf_counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import obraz  # noqa: E402
+
+
+def synthetic_paths(count):
+    kinds = [
+        "blog/_posts/2020-01-{i:02}-post-{i}.md",
+        "_drafts/draft-{i}.md",
+        "docs/section-{i}/index.md",
+        "media/images/photo-{i}.jpg",
+        "media/.thumbs/photo-{i}.jpg",
+        "_includes/include-{i}.html",
+        "css/main-{i}.css~",
+    ]
+    for i in range(count):
+        yield kinds[i % len(kinds)].format(i=i % 28 + 1).replace("/", os.path.sep)
+
+
+def old_is_file_visible(path, config):
+    parts = path.split(os.path.sep)
+    exclude = config.get("exclude", [])
+    exclude_patterns = config.get("exclude_patterns", [])
+    if path in config.get("include", []):
+        return True
+    elif any(re.match(pattern, part) for pattern in exclude_patterns for part in parts):
+        return False
+    elif any(path.startswith(s) for s in exclude):
+        return False
+    else:
+        return True
+
+
+def old_classify(path, config):
+    post_re = re.compile(
+        r"(?P<year>\d{4})-(?P<month>\d{2})-(?P<day>\d{2})-" r"(?P<title>.+)"
+    )
+    if "_drafts" in path.split(os.path.sep) and old_is_file_visible(path, config):
+        return obraz.PATH_DRAFT
+    parts = path.split(os.path.sep)
+    if "_posts" in parts and old_is_file_visible(path, config):
+        name, _ = os.path.splitext(os.path.basename(path))
+        if post_re.match(name):
+            return obraz.PATH_POST
+    for _ in range(2):
+        if old_is_file_visible(path, config) and not obraz.is_underscored(path):
+            return obraz.PATH_PAGE
+    return obraz.PATH_HIDDEN
+
+
+def new_classify(path, config):
+    for _ in range(4):
+        kind = obraz.classify_path(path, config)
+    return kind
+
+
+def bench(f, paths, config):
+    t0 = perf_counter()
+    for path in paths:
+        f(path, config)
+    return perf_counter() - t0
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    paths = list(synthetic_paths(count))
+    config = dict(obraz.DEFAULT_CONFIG)
+    old = bench(old_classify, paths, config)
+    new = bench(new_classify, paths, config)
+    print(f"paths: {count}")
+    print(f"per-loader checks: {old:.3f}s")
+    print(f"classifier:        {new:.3f}s ({old / new:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Benchmark of reading pages with YAML front matter.
+
+Usage:
+    python benchmarks/bench_front_matter.py [POSTS] [REPEAT]
+
+Compares reading the posts of a synthetic site line by line with the
+pure-Python YAML loader, as Obraz did before, with `obraz.read_template()`.
+"""
+
+import os
+import re
+import shutil
+import sys
+import tempfile
+from io import BytesIO
+from time import perf_counter
+
+import yaml
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import obraz  # noqa: E402
+import synthetic  # noqa: E402
+
+
+def read_template_by_lines(path):
+    with open(path, "rb") as fd:
+        if fd.read(3) != b"---":
+            return None
+        lines = []
+        while True:
+            line = fd.readline()
+            if re.match(b"^---\r?\n", line):
+                break
+            elif line == b"":
+                return None
+            lines.append(line)
+        front_matter = BytesIO(b"".join(lines))
+        front_matter.name = path
+        page = yaml.safe_load(front_matter)
+        if not page:
+            page = {}
+        page["content"] = fd.read().decode("utf-8")
+        return page
+
+
+def bench(read, paths, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = perf_counter()
+        for path in paths:
+            read(path)
+        times.append(perf_counter() - t0)
+    return min(times)
+
+
+def main():
+    posts = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    tempdir = tempfile.mkdtemp()
+    try:
+        synthetic.make_site(tempdir, posts=posts, static_files=0)
+        directory = os.path.join(tempdir, "_posts")
+        paths = [os.path.join(directory, name) for name in os.listdir(directory)]
+        for path in paths:
+            assert obraz.read_template(path) == read_template_by_lines(path)
+        old = bench(read_template_by_lines, paths, repeat)
+        new = bench(obraz.read_template, paths, repeat)
+        loader = obraz.yaml_loader().__name__
+        print(f"posts: {posts}, YAML loader: {loader}")
+        print(f"  line by line, SafeLoader: {old:.3f} s")
+        print(f"  read_template():          {new:.3f} s ({old / new:.1f}x)")
+    finally:
+        shutil.rmtree(tempdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Benchmark of loading source files of synthetic sites of different sizes.
+
+Usage:
+    python benchmarks/bench_loading.py [SIZE ...]
+
+Prints the time of merging the loader results of SIZE files with the
+accumulator-based loading and with repeated merge() of the whole site.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+from datetime import datetime
+from time import perf_counter
+from typing import cast
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import obraz  # noqa: E402
+
+
+def make_site(path, size):
+    posts = os.path.join(path, "_posts")
+    os.makedirs(posts)
+    for i in range(size):
+        name = f"2020-01-{i % 28 + 1:02}-post-{i}.md"
+        with open(os.path.join(posts, name), "w") as fd:
+            fd.write(f"---\ntitle: Post {i}\ntags: [t{i % 10}]\n---\nBody {i}\n")
+
+
+def config(source):
+    c = cast(obraz.Config, obraz.DEFAULT_CONFIG.copy())
+    c["source"] = source
+    c["destination"] = os.path.join(source, "_site")
+    c["time"] = datetime.utcnow()
+    return c
+
+
+def bench(size):
+    tempdir = tempfile.mkdtemp()
+    try:
+        make_site(tempdir, size)
+        c = config(tempdir)
+        obraz._quiet = True
+        t0 = perf_counter()
+        obraz.load_site(c)
+        load_time = perf_counter() - t0
+
+        data = [
+            obraz.load_post(os.path.relpath(p, tempdir), c)
+            for p in obraz.all_source_files(tempdir, c["destination"])
+        ]
+        data = [d for d in data if d]
+        t0 = perf_counter()
+        acc: dict = {}
+        for d in data:
+            obraz.merge_into(acc, d)
+        obraz.merge(dict(c), acc)
+        merge_into_time = perf_counter() - t0
+
+        merge_time = None
+        if size <= 20000:
+            t0 = perf_counter()
+            site = dict(c)
+            for d in data:
+                site = obraz.merge(site, d)
+            merge_time = perf_counter() - t0
+    finally:
+        shutil.rmtree(tempdir)
+    return load_time, merge_into_time, merge_time
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000]
+    print(f"{'files':>8} {'load_site':>10} {'merge_into':>11} {'merge':>9}")
+    for size in sizes:
+        load_time, merge_into_time, merge_time = bench(size)
+        merge = f"{merge_time:9.3f}" if merge_time is not None else f"{'-':>9}"
+        print(f"{size:8} {load_time:10.3f} {merge_into_time:11.3f} {merge}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Benchmark of serving the destination directory over HTTP.
+
+Usage:
+    python benchmarks/bench_serve.py [REQUESTS] [CLIENTS] 2>/dev/null
+
+Compares requests per second of the single-threaded `HTTPServer` with
+`SimpleHTTPRequestHandler` that Obraz used before, the default handler and the
+`--origin` handler for full responses of small and large files, and for the
+origin handler also for conditional requests answered with 304 Not Modified.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from functools import partial
+from http.client import HTTPConnection
+from http.server import HTTPServer, SimpleHTTPRequestHandler
+from time import perf_counter
+from typing import cast
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import obraz  # noqa: E402
+
+FILES = {
+    "small.html": 4 * 1024,
+    "large.bin": 4 * 1024 * 1024,
+}
+
+
+def make_destination():
+    path = tempfile.mkdtemp()
+    for name, size in FILES.items():
+        with open(os.path.join(path, name), "wb") as fd:
+            fd.write(os.urandom(size))
+    return path
+
+
+def client(address, path, count, headers):
+    conn = HTTPConnection(*address)
+    for _ in range(count):
+        conn.request("GET", path, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        if response.will_close:
+            conn.close()
+            conn = HTTPConnection(*address)
+    conn.close()
+
+
+def make_server(destination, origin):
+    if origin is None:
+        handler = partial(SimpleHTTPRequestHandler, directory=destination)
+        return HTTPServer(("localhost", 0), handler)
+    config = cast(
+        obraz.Config, dict(obraz.DEFAULT_CONFIG, port="0", destination=destination)
+    )
+    config["origin"] = origin
+    return obraz.make_server(config)
+
+
+def bench(destination, origin, path, requests, clients, headers=None):
+    server = make_server(destination, origin)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    address = server.server_address[:2]
+    threads = [
+        threading.Thread(
+            target=client, args=(address, path, requests // clients, headers or {})
+        )
+        for _ in range(clients)
+    ]
+    t0 = perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    dt = perf_counter() - t0
+    server.shutdown()
+    server.server_close()
+    thread.join()
+    return requests // clients * clients / dt
+
+
+def etag(destination, path):
+    config = cast(
+        obraz.Config, dict(obraz.DEFAULT_CONFIG, port="0", destination=destination)
+    )
+    config["origin"] = True
+    server = obraz.make_server(config)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    conn = HTTPConnection(*cast(tuple[str, int], server.server_address[:2]))
+    conn.request("HEAD", path)
+    value = conn.getresponse().headers["ETag"]
+    conn.close()
+    server.shutdown()
+    server.server_close()
+    thread.join()
+    return value
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    destination = make_destination()
+    try:
+        print(f"requests: {requests}, clients: {clients}")
+        for name in FILES:
+            path = "/" + name
+            n = requests if FILES[name] < 1024 * 1024 else requests // 10
+            old = bench(destination, None, path, n, clients)
+            default = bench(destination, False, path, n, clients)
+            new = bench(destination, True, path, n, clients)
+            print(f"{name}:")
+            print(f"  baseline handler: {old:8.0f} req/s")
+            print(f"  default handler:  {default:8.0f} req/s ({default / old:.1f}x)")
+            print(f"  origin handler:   {new:8.0f} req/s ({new / old:.1f}x)")
+            headers = {"If-None-Match": etag(destination, path)}
+            cond = bench(destination, True, path, requests, clients, headers)
+            print(f"  origin, 304:      {cond:8.0f} req/s ({cond / old:.1f}x)")
+    finally:
+        shutil.rmtree(destination)
+
+
+if __name__ == "__main__":
+    main()
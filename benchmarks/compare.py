@@ -0,0 +1,47 @@
+"""Compare the results of two benchmark runs.
+
+Usage:
+    python benchmarks/compare.py OLD.json NEW.json
+
+The files are saved by `benchmarks/bench_build.py --output`. Prints the
+results side by side with the ratio of new to old values, lower is better
+for all of them.
+"""
+
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from bench_build import format_result  # noqa: E402
+
+
+def load(path):
+    with open(path) as fd:
+        return json.load(fd)
+
+
+def main():
+    if len(sys.argv) != 3:
+        sys.exit(__doc__)
+    old, new = load(sys.argv[1]), load(sys.argv[2])
+    for data in (old, new):
+        print(f"{(data.get('commit') or 'unknown')[:12]}: {data['params']}")
+    if old["params"] != new["params"]:
+        print("Warning: the runs have different parameters")
+    print()
+    print(f"{'':>20}  {'old':>12}  {'new':>12}  {'new/old':>8}")
+    for key, value in old["results"].items():
+        if key not in new["results"]:
+            continue
+        new_value = new["results"][key]
+        ratio = f"{new_value / value:.2f}x" if value else "-"
+        print(
+            f"{key:>20}  {format_result(key, value):>12}  "
+            f"{format_result(key, new_value):>12}  {ratio:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""Synthetic site generator for benchmarks.
+
+Usage:
+    synthetic.py PATH [options]
+
+Options:
+    --posts=N           Number of posts [default: 1000].
+    --tags=N            Number of tags per post [default: 3].
+    --tag-count=N       Number of distinct tags [default: 50].
+    --layout-depth=N    Depth of the layout inheritance chain [default: 3].
+    --includes=N        Number of includes used by the post layout [default: 5].
+    --static-files=N    Number of static files [default: 200].
+    --static-size=KB    Mean size of static files, sizes are distributed
+                        exponentially [default: 64].
+    --seed=N            Random seed [default: 1].
+
+The same options and seed always produce the same site.
+"""
+
+import os
+import random
+import sys
+
+from docopt import docopt
+
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod "
+    "tempor incididunt ut labore et dolore magna aliqua enim ad minim veniam "
+    "quis nostrud exercitation ullamco laboris nisi aliquip ex ea commodo"
+).split()
+
+DEFAULT_PARAMS = {
+    "posts": 1000,
+    "tags": 3,
+    "tag_count": 50,
+    "layout_depth": 3,
+    "includes": 5,
+    "static_files": 200,
+    "static_size": 64,
+    "seed": 1,
+}
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as fd:
+        fd.write(text)
+
+
+def paragraph(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def post_body(rng):
+    parts = []
+    for i in range(rng.randint(3, 8)):
+        if i % 3 == 2:
+            parts.append(f"## {paragraph(rng, 4)}")
+        parts.append(paragraph(rng, rng.randint(20, 80)))
+        if i % 4 == 3:
+            parts.append("\n".join(f"* {paragraph(rng, 6)}" for _ in range(4)))
+    return "\n\n".join(parts) + "\n"
+
+
+def make_layouts(path, params):
+    depth = max(params["layout_depth"], 1)
+    write(
+        os.path.join(path, "_layouts", "base0.html"),
+        "---\n---\n<!DOCTYPE html>\n<html>\n<head><title>{{ page.title }}</title>\n"
+        '<link rel="stylesheet" href="/css/main.css"></head>\n'
+        "<body>\n{{ content }}\n</body>\n</html>\n",
+    )
+    for i in range(1, depth):
+        write(
+            os.path.join(path, "_layouts", f"base{i}.html"),
+            f'---\nlayout: base{i - 1}\n---\n<div class="level-{i}">\n'
+            "{{ content }}\n</div>\n",
+        )
+    includes = "".join(
+        f'{{% include "inc{i}.html" %}}\n' for i in range(params["includes"])
+    )
+    write(
+        os.path.join(path, "_layouts", "post.html"),
+        f"---\nlayout: base{depth - 1}\n---\n<article>\n<h1>{{{{ page.title }}}}</h1>\n"
+        "{{ content }}\n"
+        '<p>{% for tag in page.tags %}<a href="/tags.html#{{ tag }}">{{ tag }}</a> '
+        "{% endfor %}</p>\n"
+        f"{includes}</article>\n",
+    )
+    for i in range(params["includes"]):
+        write(
+            os.path.join(path, "_includes", f"inc{i}.html"),
+            f'<aside class="inc-{i}">{{{{ site.name }}}} {{{{ page.date }}}}</aside>\n',
+        )
+
+
+def make_posts(path, params, rng):
+    tags = [f"tag{i}" for i in range(max(params["tag_count"], 1))]
+    for i in range(params["posts"]):
+        year = 2000 + i // 336
+        month = i // 28 % 12 + 1
+        day = i % 28 + 1
+        post_tags = rng.sample(tags, min(params["tags"], len(tags)))
+        write(
+            os.path.join(path, "_posts", f"{year}-{month:02}-{day:02}-post-{i}.md"),
+            f"---\nlayout: post\ntitle: Post {i}\ntags: [{', '.join(post_tags)}]\n"
+            f"---\n{post_body(rng)}",
+        )
+
+
+def make_pages(path, params):
+    depth = max(params["layout_depth"], 1)
+    write(
+        os.path.join(path, "index.html"),
+        f"---\nlayout: base{depth - 1}\ntitle: Index\n---\n<ul>\n"
+        "{% for post in site.posts[:10] %}\n"
+        '<li><a href="{{ post.url }}">{{ post.title }}</a>\n'
+        "{{ post.content | striptags | truncate(200) }}</li>\n"
+        "{% endfor %}\n</ul>\n",
+    )
+    write(
+        os.path.join(path, "archive.html"),
+        f"---\nlayout: base{depth - 1}\ntitle: Archive\n---\n<ul>\n"
+        "{% for post in site.posts %}\n"
+        '<li>{{ post.date.strftime("%Y-%m-%d") }} '
+        '<a href="{{ post.url }}">{{ post.title }}</a></li>\n'
+        "{% endfor %}\n</ul>\n",
+    )
+    write(
+        os.path.join(path, "tags.html"),
+        f"---\nlayout: base{depth - 1}\ntitle: Tags\n---\n"
+        "{% for tag, posts in site.tags | dictsort %}\n"
+        '<h2 id="{{ tag }}">{{ tag }}</h2>\n<ul>\n'
+        "{% for post in posts %}"
+        '<li><a href="{{ post.url }}">{{ post.title }}</a></li>'
+        "{% endfor %}\n</ul>\n{% endfor %}\n",
+    )
+    write(os.path.join(path, "css", "main.css"), "body { margin: 0 auto; }\n")
+
+
+def make_static_files(path, params, rng):
+    mean = params["static_size"] * 1024
+    for i in range(params["static_files"]):
+        size = int(rng.expovariate(1 / mean)) if mean else 0
+        name = os.path.join(path, "media", f"dir{i % 10}", f"file-{i}.bin")
+        os.makedirs(os.path.dirname(name), exist_ok=True)
+        with open(name, "wb") as fd:
+            fd.write(rng.randbytes(size))
+
+
+def make_site(path, **params):
+    """Generate a synthetic site in path, params are from DEFAULT_PARAMS."""
+    params = dict(DEFAULT_PARAMS, **params)
+    rng = random.Random(params["seed"])
+    write(os.path.join(path, "_config.yml"), "name: Synthetic Site\n")
+    make_layouts(path, params)
+    make_posts(path, params, rng)
+    make_pages(path, params)
+    make_static_files(path, params, rng)
+    return params
+
+
+def options_params(opts):
+    """Convert docopt options named like DEFAULT_PARAMS keys to params."""
+    params = {}
+    for key in DEFAULT_PARAMS:
+        value = opts.get("--" + key.replace("_", "-"))
+        if value is not None:
+            params[key] = int(value)
+    return params
+
+
+def main():
+    opts = docopt(__doc__, argv=sys.argv[1:])
+    params = make_site(opts["PATH"], **options_params(opts))
+    print(f"Generated a site in {opts['PATH']}: {params}")
+
+
+if __name__ == "__main__":
+    main()
@@ -31,7 +31,7 @@ Configuration in `_config.yml`:
 
 Requirements:
 
-* Obraz >= 0.9.3
+* Obraz >= 0.9.6
 * lessc (npm install -g less)
 """
 
@@ -72,6 +72,5 @@ def generate_less(site: obraz.Site) -> None:
     lessc = site.get("lessc", "lessc")
     for file_ in site.get("less_files", []):
         src = os.path.join(site["source"], file_["path"])
-        dst = os.path.join(site["destination"], obraz.url2path(file_["url"]))
-        obraz.make_dirs(os.path.dirname(dst))
-        subprocess.check_call([lessc, src, dst])
+        css = subprocess.check_output([lessc, src])
+        obraz.write_file(obraz.url2path(file_["url"]), css, site)
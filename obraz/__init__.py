@@ -24,12 +24,13 @@
 """Static blog-aware site generator in Python mostly compatible with Jekyll.
 
 Usage:
-    obraz (build | serve | new PATH) [options]
+    obraz (build | serve | daemon | new PATH) [options]
     obraz -h|--help
 
 Commands:
     build                   Build your site.
     serve                   Serve your site locally.
+    daemon                  Keep your site in memory and build it on requests.
     new                     Create a new Obraz site scaffold in PATH.
 
 Options:
@@ -37,12 +38,24 @@ Options:
     -d --destination=DIR    Destination directory.
     --force                 Force overwriting the destination directory.
     --safe                  Disable custom plugins.
+    -j --jobs=N             Render pages in N parallel processes.
+    --clean                 Ignore the build cache and rebuild everything.
+    --atomic                Build in a staging directory and swap it in.
+    --keep=N                Keep N previous builds with --atomic.
+    --profile               Report the slowest build steps.
+    --profile-output=FILE   Save build step timings to FILE.
+    --profile-format=FMT    Format of the timings: json (default) or chrome.
+    --low-memory            Keep page contents on disk instead of in memory.
+    --socket=PATH           Unix socket of the daemon, with build ask the daemon
+                            to build the site.
 
     -w --watch              Watch for changes and rebuild.
     -D --drafts             Render posts in the _drafts folder.
     -H --host=HOSTNAME      Listen at the given hostname.
     -P --port=PORT          Listen at the given port.
     -b --baseurl=URL        Serve the website from the given base URL.
+    --origin                Serve with ETags, conditional and range requests.
+    --memory                Serve the site from memory without writing it.
 
     -q --quiet              Be quiet.
     -t --trace              Display traceback when an error occurs.
@@ -53,22 +66,30 @@ For documentation see <https://obraz.pirx.ru/>.
 """
 
 import contextlib
+import ctypes
+import errno
+import functools
+import hashlib
+import json
 import os
 import re
+import select
 import shutil
+import struct
 import sys
 import traceback
+from collections import OrderedDict
 from datetime import datetime
 from glob import glob
-from http.server import SimpleHTTPRequestHandler, HTTPServer
 from io import BytesIO
-from threading import Thread
-from time import sleep
+from time import perf_counter, sleep
 from typing import (
+    TYPE_CHECKING,
     BinaryIO,
     Any,
     Callable,
     Iterable,
+    Iterator,
     Sequence,
     TypeVar,
     Optional,
@@ -76,12 +97,19 @@ from typing import (
     Union,
     cast,
 )
-from urllib.request import pathname2url, url2pathname
+from urllib.parse import unquote, urlsplit
 
-import yaml
-from docopt import docopt
-from jinja2 import Environment, FileSystemLoader
-from markdown import markdown
+if sys.platform == "win32":
+    from nturl2path import pathname2url, url2pathname
+else:
+    from urllib.parse import quote as pathname2url, unquote as url2pathname
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer as _HTTPServer
+    from jinja2 import Environment, Template as Jinja2Template
+    from markdown import Markdown
+else:
+    _HTTPServer = object
 
 __all__ = [
     "file_filter",
@@ -93,6 +121,43 @@ __all__ = [
 ]
 
 PAGE_ENCODING = "UTF-8"
+PATH_HIDDEN = "hidden"
+PATH_POST = "post"
+PATH_DRAFT = "draft"
+PATH_UNDERSCORED = "underscored"
+PATH_PAGE = "page"
+POST_RE = re.compile(r"(?P<year>\d{4})-(?P<month>\d{2})-(?P<day>\d{2})-(?P<title>.+)")
+WATCH_DELAY = 0.1
+DAEMON_TIMEOUT = 10.0
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+INOTIFY_MASK = (
+    IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+)
+FRONT_MATTER_END = re.compile(b"\n---\r?\n")
+CACHE_DIR = ".obraz_cache"
+CACHE_VERSION = 2
+TEMPLATE_CACHE_SIZE = 1024
+LOW_MEMORY_CACHE_SIZE = 64
+MARKDOWN_CACHE_SIZE = 4096
+PROFILE_TOP = 20
+CHUNK_SIZE = 64 * 1024
+FICLONE = 0x40049409
+FILE_SYNC_STRATEGIES = ("copy", "hardlink", "reflink", "copy_file_range")
+ENTRY_KEYS = ("posts", "pages", "files", "tags")
 
 
 class ConfigBase(TypedDict):
@@ -101,7 +166,6 @@ class ConfigBase(TypedDict):
     include: list[str]
     exclude: list[str]
     exclude_patterns: list[str]
-    full_build_patterns: list[str]
     host: str
     port: str
     baseurl: str
@@ -113,6 +177,20 @@ class Config(ConfigBase, total=False):
     drafts: bool
     force: bool
     trace: bool
+    jobs: Union[int, str]
+    clean: bool
+    origin: bool
+    memory: bool
+    file_sync: str
+    file_sync_hash: bool
+    atomic: bool
+    keep: Union[int, str]
+    markdown_extensions: list[str]
+    profile: bool
+    profile_output: str
+    profile_format: str
+    low_memory: bool
+    socket: str
 
 
 class File(TypedDict):
@@ -149,6 +227,56 @@ class Post(PostBase, total=False):
     tags: list[str]
 
 
+class Layout(TypedDict):
+    template: Template
+    chain: list[Template]
+    names: list[str]
+
+
+class Dependencies(TypedDict):
+    layouts: list[str]
+    includes: list[str]
+    site: list[str]
+
+
+class CachedPage(TypedDict):
+    key: str
+    size: int
+    mtime: int
+    content: str
+    deps: Dependencies
+
+
+class BuildCache(TypedDict):
+    version: int
+    destination: str
+    pages: dict[str, CachedPage]
+    files: list[str]
+
+
+class BuildState(TypedDict):
+    directory: Optional[str]
+    previous: BuildCache
+    current: BuildCache
+    contents: dict[int, str]
+    changed: list[str]
+    skipped: int
+    common: bytes
+    digests: dict[int, bytes]
+    site_digests: dict[str, bytes]
+    deps_digests: dict[tuple[tuple[str, ...], ...], bytes]
+    file_digests: dict[str, bytes]
+    existing: dict[str, tuple[int, int]]
+
+
+class ProfileEvent(TypedDict):
+    cat: str
+    name: str
+    ts: float
+    dur: float
+    pid: int
+
+
 class SiteContents(TypedDict, total=False):
     files: list[File]
     pages: list[Page]
@@ -160,16 +288,26 @@ class Site(SiteContents, Config):
     pass
 
 
+class ResidentSite(TypedDict):
+    config: Config
+    loaded: dict[str, SiteContents]
+    site: Optional[Site]
+    copies: dict[str, SiteContents]
+    owners: dict[int, str]
+    order: dict[str, int]
+    sources: dict[int, Any]
+    digests: dict[int, bytes]
+    contents: dict[int, str]
+    rendered: dict[int, tuple[str, Any]]
+    cache: Optional[BuildCache]
+
+
 DEFAULT_CONFIG: ConfigBase = {
     "source": "./",
     "destination": "./_site",
     "include": [".htaccess"],
     "exclude": [],
     "exclude_patterns": [r"^[\.#].*", r".*~$", r".*\.sw[op]$"],
-    "full_build_patterns": [
-        r"_layouts",
-        r"_includes",
-    ],
     "host": "localhost",
     "port": "8000",
     "baseurl": "",
@@ -178,10 +316,30 @@ DEFAULT_CONFIG: ConfigBase = {
 
 _quiet = False
 _loaders: list[Callable[[str, Config], Optional[SiteContents]]] = []
+_parallel_loaders: set[Callable[[str, Config], Optional[SiteContents]]] = set()
 _processors: list[Callable[[Site], None]] = []
 _render_string = lambda s, _context, _config: s
 _file_filters: dict[str, Callable[[str, Config], str]] = {}
 _template_filters: dict[str, Callable[[str, Config], str]] = {}
+_jinja2_env: Optional[tuple[tuple, "Environment", list[Config]]] = None
+_markdown: Optional[tuple[tuple[str, ...], "Markdown"]] = None
+_markdown_html: "OrderedDict[bytes, str]" = OrderedDict()
+_jinja2_templates: "OrderedDict[bytes, Jinja2Template]" = OrderedDict()
+_layouts: Optional[tuple[Config, dict[str, Layout]]] = None
+_path_classifier: Optional[tuple[Config, Callable[[str], str]]] = None
+_forked_site: Optional[tuple["Site", list["Page"]]] = None
+_forked_loading: Optional[tuple[Config, list[str], int]] = None
+_build_state: Optional[BuildState] = None
+_dependencies: Optional[dict[str, set[str]]] = None
+_site_view: Optional[tuple["Site", "SiteView"]] = None
+_resident: Optional[ResidentSite] = None
+_etags: dict[str, tuple[int, int, str]] = {}
+_memory_output: Optional[dict[str, Union[bytes, str]]] = None
+_serving = False
+_plugins_digest = hashlib.sha1().digest()
+_generators: list[Callable[["Site"], None]] = []
+_profile: Optional[list["ProfileEvent"]] = None
+_profile_start = 0.0
 _T = TypeVar("_T")
 
 
@@ -213,10 +371,26 @@ def template_renderer(f: Callable[[str, dict[str, Any], Config], str]) -> Any:
     return f
 
 
-def loader(f: Callable[[str, Config], Optional[SiteContents]]) -> Any:
-    """Register a site source content loader."""
-    _loaders.insert(0, f)
-    return f
+def loader(
+    f: Optional[Callable[[str, Config], Optional[SiteContents]]] = None,
+    *,
+    parallel: bool = False,
+) -> Any:
+    """Register a site source content loader.
+
+    Loaders registered with `parallel=True` may be run in worker processes when
+    the site is built with several jobs.
+    """
+
+    def wrapper(
+        f: Callable[[str, Config], Optional[SiteContents]]
+    ) -> Callable[[str, Config], Optional[SiteContents]]:
+        _loaders.insert(0, f)
+        if parallel:
+            _parallel_loaders.add(f)
+        return f
+
+    return wrapper(f) if f is not None else wrapper
 
 
 def processor(f: Callable[[Site], None]) -> Any:
@@ -228,18 +402,35 @@ def processor(f: Callable[[Site], None]) -> Any:
 def generator(f: Callable[[Site], None]) -> Any:
     """Register a destination files generator for the site."""
     _processors.append(f)
+    _generators.append(f)
     return f
 
 
 def fallback_loader(f: Callable[[str, Config], Optional[SiteContents]]) -> Any:
     _loaders.append(f)
+    _parallel_loaders.add(f)
     return f
 
 
+@functools.lru_cache(maxsize=None)
+def yaml_loader() -> Any:
+    """Return the safe YAML loader, the one based on libyaml if available."""
+    import yaml
+
+    return getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def load_yaml(stream: Any) -> Any:
+    """Parse YAML safely using libyaml if it is available."""
+    import yaml
+
+    return yaml.load(stream, Loader=yaml_loader())
+
+
 def load_yaml_mapping(path: str) -> dict:
     try:
         with open(path, "rb") as fd:
-            mapping = yaml.safe_load(fd)
+            mapping = load_yaml(fd)
             return mapping if mapping else {}
     except FileNotFoundError:
         return {}
@@ -264,48 +455,325 @@ def merge(x1: _T, x2: _T) -> _T:
         raise ValueError(f"Cannot merge '{x1!r}' and '{x2!r}'")
 
 
-def all_source_files(source: str, destination: str) -> Iterable[str]:
-    dst_base, dst_name = os.path.split(os.path.realpath(destination))
-    for source, dirs, files in os.walk(source):
-        if os.path.realpath(source) == dst_base and dst_name in dirs:
-            dirs.remove(dst_name)
-        for filename in files:
-            yield os.path.join(source, filename)
+def merge_into(x1: dict, x2: dict) -> None:
+    """Merge x2 into x1 in place with the same semantics as merge()."""
+    for k, v in x2.items():
+        if k not in x1:
+            x1[k] = copy_containers(v)
+            continue
+        old = x1[k]
+        if isinstance(old, dict) and isinstance(v, dict):
+            merge_into(old, v)
+        elif isinstance(old, list) and isinstance(v, list):
+            old.extend(v)
+        elif old != v:
+            raise ValueError(f"Cannot merge '{old!r}' and '{v!r}'")
+
+
+def copy_containers(x: _T) -> _T:
+    if isinstance(x, dict):
+        return cast(_T, {k: copy_containers(v) for k, v in x.items()})
+    elif isinstance(x, list):
+        return cast(_T, x.copy())
+    else:
+        return x
+
+
+def all_source_files(
+    source: str, destination: str, config: Optional[Config] = None
+) -> Iterable[str]:
+    for _, files in walk_source(source, source, destination, config):
+        yield from files
+
+
+def walk_source(
+    path: str, source: str, destination: str, config: Optional[Config] = None
+) -> Iterable[tuple[str, list[str]]]:
+    """Walk directories under path top-down yielding their files.
+
+    The destination directory, the build cache and generations directories,
+    and symlinks to directories are skipped as well as directories excluded by
+    the site config.
+    """
+    try:
+        dst_stat: Optional[os.stat_result] = os.stat(destination)
+    except OSError:
+        dst_stat = None
+    skipped = build_directories(source, destination)
+    stack = [path]
+    while stack:
+        root = stack.pop()
+        files, dirs = [], []
+        try:
+            entries = os.scandir(root)
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if not is_dir:
+                    files.append(entry.path)
+                elif entry.is_symlink():
+                    continue
+                elif (
+                    dst_stat is not None
+                    and entry.inode() == dst_stat.st_ino
+                    and os.path.samestat(entry.stat(), dst_stat)
+                ):
+                    continue
+                elif (
+                    entry.name.startswith(".")
+                    and os.path.realpath(entry.path) in skipped
+                ):
+                    continue
+                elif config is not None and not is_dir_visible(
+                    os.path.relpath(entry.path, source), config
+                ):
+                    continue
+                else:
+                    dirs.append(entry.path)
+        yield root, files
+        stack.extend(reversed(dirs))
+
+
+def build_directories(source: str, destination: str) -> list[str]:
+    """Return the real paths of directories written by builds of the site."""
+    return [
+        os.path.realpath(path)
+        for path in [
+            destination,
+            os.path.join(source, CACHE_DIR),
+            generations_directory(destination),
+        ]
+    ]
+
+
+def is_build_path(path: str, directories: list[str]) -> bool:
+    real_path = os.path.join(os.path.realpath(path), "")
+    return any(real_path.startswith(os.path.join(d, "")) for d in directories)
 
 
 def changed_files(
     source: str, destination: str, config: Config, poll_interval: int = 1
 ) -> Iterable[list[str]]:
-    times: dict[str, float] = {}
+    """Yield lists of visible source files changed since the previous list.
+
+    All the files are reported first. Inotify is used on Linux, otherwise
+    the source tree is polled every `poll_interval` seconds.
+    """
+    watch = inotify_watch(source, destination, config)
+    if watch:
+        return inotify_changed_files(watch, source, destination, config)
+    return poll_changed_files(source, destination, config, poll_interval)
+
+
+def poll_changed_files(
+    source: str, destination: str, config: Config, poll_interval: int = 1
+) -> Iterable[list[str]]:
+    stats: dict[str, tuple[int, int]] = {}
     while True:
-        changed = []
-        for path in all_source_files(source, destination):
-            rel_path = os.path.relpath(path, source)
-            if not is_file_visible(rel_path, config):
-                continue
-            new = os.stat(path).st_mtime
-            old = times.get(path)
-            if not old or new > old:
-                times[path] = new
-                changed.append(path)
+        changed = scan_changed_files(source, destination, config, stats)
         if changed:
             yield changed
         sleep(poll_interval)
 
 
+def scan_changed_files(
+    source: str, destination: str, config: Config, stats: dict[str, tuple[int, int]]
+) -> list[str]:
+    """Return visible source files changed since `stats` were taken.
+
+    The `stats` dict of modification times and sizes by paths is updated.
+    """
+    changed = []
+    seen = set()
+    for path in all_source_files(source, destination, config):
+        rel_path = os.path.relpath(path, source)
+        if not is_file_visible(rel_path, config):
+            continue
+        seen.add(path)
+        st = os.stat(path)
+        new = (st.st_mtime_ns, st.st_size)
+        if stats.get(path) != new:
+            stats[path] = new
+            changed.append(path)
+    for path in list(stats):
+        if path not in seen:
+            del stats[path]
+            changed.append(path)
+    return changed
+
+
+def inotify_watch(
+    source: str, destination: str, config: Optional[Config] = None
+) -> Optional[tuple[Any, int, dict]]:
+    """Start watching the source directories via inotify if it is available."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        fd = libc.inotify_init1(IN_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    watches: dict[int, str] = {}
+    try:
+        inotify_add_watches(libc, fd, source, source, destination, config, watches)
+    except OSError as e:
+        info(f"Cannot watch files via inotify: {e}")
+        os.close(fd)
+        return None
+    return libc, fd, watches
+
+
+def inotify_add_watches(
+    libc: Any,
+    fd: int,
+    path: str,
+    source: str,
+    destination: str,
+    config: Optional[Config],
+    watches: dict[int, str],
+) -> None:
+    for root, _ in walk_source(path, source, destination, config):
+        wd = libc.inotify_add_watch(fd, os.fsencode(root), INOTIFY_MASK)
+        if wd < 0:
+            code = ctypes.get_errno()
+            if code == errno.ENOENT:
+                continue
+            raise OSError(code, os.strerror(code), root)
+        watches[wd] = root
+
+
+def inotify_events(fd: int, watches: dict[int, str]) -> Iterable[tuple[int, str]]:
+    data = os.read(fd, 64 * 1024)
+    header = struct.calcsize("iIII")
+    pos = 0
+    while pos < len(data):
+        wd, mask, _, size = struct.unpack_from("iIII", data, pos)
+        name = data[pos + header : pos + header + size].rstrip(b"\0")
+        pos += header + size
+        if mask & IN_Q_OVERFLOW:
+            yield mask, ""
+        elif wd in watches:
+            if mask & (IN_IGNORED | IN_DELETE_SELF):
+                del watches[wd]
+            elif name:
+                yield mask, os.path.join(watches[wd], os.fsdecode(name))
+
+
+def inotify_changed_files(
+    watch: tuple[Any, int, dict], source: str, destination: str, config: Config
+) -> Iterable[list[str]]:
+    """Yield lists of changed files reported by inotify.
+
+    Events that follow each other within WATCH_DELAY seconds are coalesced
+    into one list, so saving a file by an editor triggers only one rebuild.
+    """
+    libc, fd, watches = watch
+    directories = build_directories(source, destination)
+
+    def visible_files(path: str) -> Iterable[str]:
+        for _, files in walk_source(path, source, destination, config):
+            for p in files:
+                if is_file_visible(os.path.relpath(p, source), config):
+                    yield p
+
+    try:
+        yield list(visible_files(source))
+        while True:
+            changed: set[str] = set()
+            timeout = None
+            while select.select([fd], [], [], timeout)[0]:
+                timeout = WATCH_DELAY
+                for mask, path in inotify_events(fd, watches):
+                    if not path:
+                        changed.update(visible_files(source))
+                        continue
+                    if is_build_path(path, directories):
+                        continue
+                    if not is_file_visible(os.path.relpath(path, source), config):
+                        continue
+                    if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                        with contextlib.suppress(OSError):
+                            inotify_add_watches(
+                                libc, fd, path, source, destination, config, watches
+                            )
+                        changed.update(visible_files(path))
+                    changed.add(path)
+            if changed:
+                yield sorted(changed)
+    finally:
+        os.close(fd)
+
+
+@functools.lru_cache(maxsize=None)
+def compile_patterns(patterns: tuple[str, ...]) -> list[re.Pattern]:
+    """Compile patterns into one alternation if possible."""
+    if len(patterns) > 1:
+        with contextlib.suppress(re.error):
+            return [re.compile("|".join(f"(?:{p})" for p in patterns))]
+    return [re.compile(pattern) for pattern in patterns]
+
+
+def path_classifier(config: Config) -> Callable[[str], str]:
+    """Return a function that classifies source paths for the site config.
+
+    The exclusion rules are prepared once per config. The result for the
+    last path is remembered, since all the loaders check the same path.
+    """
+    global _path_classifier
+    if _path_classifier is not None and _path_classifier[0] is config:
+        return _path_classifier[1]
+    include = set(config.get("include", []))
+    exclude = tuple(config.get("exclude", []))
+    patterns = compile_patterns(tuple(config.get("exclude_patterns", [])))
+    sep = os.path.sep
+
+    @functools.lru_cache(maxsize=1)
+    def classify(path: str) -> str:
+        parts = path.split(sep)
+        if path not in include:
+            for p in patterns:
+                for part in parts:
+                    if p.match(part):
+                        return PATH_HIDDEN
+            if path.startswith(exclude):
+                return PATH_HIDDEN
+        if "_posts" in parts:
+            name, _ = os.path.splitext(parts[-1])
+            return PATH_POST if POST_RE.match(name) else PATH_UNDERSCORED
+        elif "_drafts" in parts:
+            return PATH_DRAFT
+        elif any(part.startswith("_") for part in parts):
+            return PATH_UNDERSCORED
+        else:
+            return PATH_PAGE
+
+    _path_classifier = (config, classify)
+    return classify
+
+
+def classify_path(path: str, config: Config) -> str:
+    """Classify a source path as a post, a draft, a page, etc."""
+    return path_classifier(config)(path)
+
+
 def is_file_visible(path: str, config: Config) -> bool:
     """Check file name visibility according to site settings."""
-    parts = path.split(os.path.sep)
-    exclude = config.get("exclude", [])
-    exclude_patterns = config.get("exclude_patterns", [])
-    if path in config.get("include", []):
-        return True
-    elif any(re.match(pattern, part) for pattern in exclude_patterns for part in parts):
-        return False
-    elif any(path.startswith(s) for s in exclude):
-        return False
-    else:
+    return classify_path(path, config) != PATH_HIDDEN
+
+
+def is_dir_visible(path: str, config: Config) -> bool:
+    """Check if a directory may contain visible files."""
+    if is_file_visible(path, config):
         return True
+    prefix = path + os.path.sep
+    return any(s.startswith(prefix) for s in config.get("include", []))
 
 
 def is_underscored(path: str) -> bool:
@@ -327,11 +795,154 @@ def url2path(url: str) -> str:
     return url2pathname(url).lstrip(os.path.sep)
 
 
+def memory_key(path: str) -> str:
+    """Return the key of a destination path in the in-memory output.
+
+    Keys are URL paths without percent-encoding, as requested paths are
+    looked up after unquoting them.
+    """
+    return "/" + path.replace(os.path.sep, "/")
+
+
 def make_dirs(path: str) -> None:
     with contextlib.suppress(FileExistsError):
         os.makedirs(path)
 
 
+def write_file_atomic(path: str, data: bytes) -> None:
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "wb") as fd:
+            fd.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp)
+        raise
+
+
+def clone_file(src: str, dst: str, strategy: str) -> None:
+    """Create dst as a copy of src using the file sync strategy.
+
+    Falls back to a regular copy if the strategy is not supported by the
+    platform or the file system. The copy gets the mtime of the source.
+    """
+    if strategy == "hardlink":
+        with contextlib.suppress(OSError):
+            os.link(src, dst)
+            return
+    elif strategy in ("reflink", "copy_file_range"):
+        try:
+            with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+                if strategy == "reflink":
+                    import fcntl
+
+                    fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+                else:
+                    while os.copy_file_range(fsrc.fileno(), fdst.fileno(), 1 << 30):
+                        pass
+            shutil.copystat(src, dst)
+            return
+        except (OSError, ImportError, AttributeError):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(dst)
+    shutil.copy2(src, dst)
+
+
+def same_file_contents(src: str, dst: str, config: Config) -> bool:
+    """Check if dst is a copy of src by size and mtime, or optionally by hash."""
+    try:
+        st1, st2 = os.stat(src), os.stat(dst)
+    except FileNotFoundError:
+        return False
+    if os.path.samestat(st1, st2):
+        return True
+    if st1.st_size != st2.st_size:
+        return False
+    if st1.st_mtime_ns == st2.st_mtime_ns:
+        return True
+    return bool(config.get("file_sync_hash")) and file_digest(src) == file_digest(dst)
+
+
+def sync_file(src: str, dst: str, config: Config) -> bool:
+    """Copy src to dst unless it is already there, return if dst was written."""
+    strategy = config.get("file_sync", "copy")
+    if strategy not in FILE_SYNC_STRATEGIES:
+        raise Exception(f"Unknown file sync strategy: '{strategy}'")
+    if same_file_contents(src, dst, config):
+        return False
+    tmp = f"{dst}.{os.getpid()}.tmp"
+    try:
+        clone_file(src, tmp, strategy)
+        os.replace(tmp, dst)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp)
+        raise
+    return True
+
+
+def write_file(path: str, data: bytes, config: Config) -> bool:
+    """Write data to the path relative to the destination directory.
+
+    Generators should write their output using this function or `copy_file`,
+    so it is kept in memory when the site is served with `--memory`.
+
+    The file isn't touched if it already has the same contents. Returns if it
+    was written.
+    """
+    written = write_output(path, data, config)
+    remember_file(path, written)
+    return written
+
+
+def write_output(path: str, data: bytes, config: Config) -> bool:
+    if _memory_output is not None:
+        _memory_output[memory_key(path)] = data
+        return True
+    dst = os.path.join(config["destination"], path)
+    if same_contents(dst, data):
+        return False
+    make_dirs(os.path.dirname(dst))
+    write_file_atomic(dst, data)
+    return True
+
+
+def same_contents(path: str, data: bytes) -> bool:
+    try:
+        if os.stat(path).st_size != len(data):
+            return False
+        with open(path, "rb") as fd:
+            return hashlib.sha1(fd.read()).digest() == hashlib.sha1(data).digest()
+    except OSError:
+        return False
+
+
+def copy_file(src: str, path: str, config: Config) -> bool:
+    """Copy the file src to the path relative to the destination directory.
+
+    The file isn't copied if it is already there. Returns if it was copied.
+    """
+    if _memory_output is not None:
+        _memory_output[memory_key(path)] = os.path.abspath(src)
+        return True
+    dst = os.path.join(config["destination"], path)
+    make_dirs(os.path.dirname(dst))
+    copied = sync_file(src, dst, config)
+    remember_file(path, copied)
+    return copied
+
+
+def remember_file(path: str, written: bool) -> None:
+    """Record a file output of the build, so it isn't pruned as a stale one."""
+    if _build_state is not None:
+        _build_state["current"]["files"].append(path)
+        if written:
+            _build_state["changed"].append(path)
+        else:
+            _build_state["skipped"] += 1
+
+
 def remove(path: str) -> None:
     with contextlib.suppress(FileExistsError):
         if os.path.isdir(path):
@@ -356,12 +967,13 @@ def log(message: str) -> None:
     sys.stderr.flush()
 
 
-def progress(msg: str, xs: Sequence[_T]) -> Iterable[_T]:
+def progress(msg: str, xs: Iterable[_T], size: Optional[int] = None) -> Iterable[_T]:
     if _quiet:
         for x in xs:
             yield x
     else:
-        size = len(xs)
+        if size is None:
+            size = len(cast(Sequence[_T], xs))
         for i, x in enumerate(xs, 1):
             yield x
             s = f"{msg}: {int(i * 100 / size)}% ({i}/{size})"
@@ -369,6 +981,96 @@ def progress(msg: str, xs: Sequence[_T]) -> Iterable[_T]:
         sys.stderr.write("\n")
 
 
+def start_profile() -> None:
+    global _profile, _profile_start
+    _profile = []
+    _profile_start = perf_counter()
+
+
+@contextlib.contextmanager
+def profiled(category: str, name: str) -> Iterator[None]:
+    """Record the time spent in the block if profiling is enabled."""
+    if _profile is None:
+        yield
+        return
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        _profile.append(
+            {
+                "cat": category,
+                "name": name,
+                "ts": start - _profile_start,
+                "dur": perf_counter() - start,
+                "pid": os.getpid(),
+            }
+        )
+
+
+def profile_call(
+    category: str, name: Optional[str], f: Callable[..., _T], *args: Any
+) -> _T:
+    """Call the function recording its time, named after it by default."""
+    if _profile is None:
+        return f(*args)
+    with profiled(category, name or object_name(f)):
+        return f(*args)
+
+
+def profile_summary(events: list[ProfileEvent]) -> list[dict[str, Any]]:
+    totals: dict[tuple[str, str], dict[str, Any]] = {}
+    for event in events:
+        key = (event["cat"], event["name"])
+        if key not in totals:
+            totals[key] = {"cat": event["cat"], "name": event["name"]}
+            totals[key].update(calls=0, total=0.0)
+        totals[key]["calls"] += 1
+        totals[key]["total"] += event["dur"]
+    return sorted(totals.values(), key=lambda t: t["total"], reverse=True)
+
+
+def finish_profile(config: Config) -> None:
+    """Report the slowest build steps and save the timings if requested."""
+    global _profile
+    events, _profile = _profile, None
+    if events is None:
+        return
+    summary = profile_summary(events)
+    if config.get("profile"):
+        lines = [f"{'Total, ms':>12} {'Calls':>7}  Step"]
+        for t in summary[:PROFILE_TOP]:
+            total = t["total"] * 1000
+            lines.append(f"{total:12.1f} {t['calls']:7}  {t['cat']}: {t['name']}")
+        sys.stderr.write("\n".join(lines) + "\n")
+    path = config.get("profile_output")
+    if not path:
+        return
+    fmt = config.get("profile_format") or "json"
+    data: dict[str, Any]
+    if fmt == "json":
+        data = {"events": events, "summary": summary}
+    elif fmt == "chrome":
+        trace = []
+        for event in events:
+            trace.append(
+                {
+                    "name": event["name"],
+                    "cat": event["cat"],
+                    "ph": "X",
+                    "ts": event["ts"] * 1e6,
+                    "dur": event["dur"] * 1e6,
+                    "pid": event["pid"],
+                    "tid": event["pid"],
+                }
+            )
+        data = {"traceEvents": trace, "displayTimeUnit": "ms"}
+    else:
+        raise Exception(f"Unknown profile format: '{fmt}'")
+    with open(path, "w") as fd:
+        json.dump(data, fd, indent=1)
+
+
 def file_suffix(path: str) -> str:
     _, ext = os.path.splitext(path)
     return ext
@@ -384,15 +1086,41 @@ def object_name(f: Any) -> str:
     return f.__name__
 
 
+def cache_size(size: int, config: Config) -> int:
+    """Return the size limit of an in-memory cache for the build config."""
+    return min(size, LOW_MEMORY_CACHE_SIZE) if config.get("low_memory") else size
+
+
 @template_filter("markdownify")
 @file_filter([".md", ".markdown"])
 def markdown_filter(s: str, config: Config) -> str:
-    return markdown(s)
+    extensions = tuple(config.get("markdown_extensions", []))
+    h = hashlib.sha1(repr(extensions).encode(PAGE_ENCODING))
+    h.update(s.encode(PAGE_ENCODING))
+    key = h.digest()
+    html = _markdown_html.get(key)
+    if html is not None:
+        _markdown_html.move_to_end(key)
+        return html
+    html = markdown_converter(extensions).reset().convert(s)
+    _markdown_html[key] = html
+    if len(_markdown_html) > cache_size(MARKDOWN_CACHE_SIZE, config):
+        _markdown_html.popitem(last=False)
+    return html
+
+
+def markdown_converter(extensions: tuple[str, ...]) -> "Markdown":
+    global _markdown
+    if _markdown is None or _markdown[0] != extensions:
+        from markdown import Markdown
+
+        _markdown = (extensions, Markdown(extensions=list(extensions)))
+    return _markdown[1]
 
 
 @fallback_loader
 def load_file(path: str, config: Config) -> Optional[SiteContents]:
-    if not is_file_visible(path, config) or is_underscored(path):
+    if classify_path(path, config) != PATH_PAGE:
         return None
     file: File = {"url": path2url(path), "path": path}
     return {
@@ -400,48 +1128,176 @@ def load_file(path: str, config: Config) -> Optional[SiteContents]:
     }
 
 
-@template_renderer
-def jinja2_render_string(string: str, context: dict[str, Any], config: Config) -> str:
-    includes = os.path.join(config["source"], "_includes")
-    env = Environment(loader=FileSystemLoader(includes))
+@functools.lru_cache(maxsize=None)
+def tracking_environment() -> "type[Environment]":
+    """Return the Jinja2 environment class that records included templates."""
+    from jinja2 import Environment
+
+    class TrackingEnvironment(Environment):
+        def get_template(
+            self, name: Any, *args: Any, **kwargs: Any
+        ) -> "Jinja2Template":
+            if isinstance(name, str):
+                add_dependency("includes", name)
+            return super().get_template(name, *args, **kwargs)
+
+        def select_template(
+            self, names: Any, *args: Any, **kwargs: Any
+        ) -> "Jinja2Template":
+            for name in names:
+                if isinstance(name, str):
+                    add_dependency("includes", name)
+            return super().select_template(names, *args, **kwargs)
+
+    return TrackingEnvironment
+
+
+def jinja2_environment(config: Config) -> "Environment":
+    """Return the Jinja2 environment shared by the builds of the site.
+
+    The environment and the compiled templates are kept while the includes
+    directory and the template filters stay the same. Template filters get the
+    config of the current build, changed includes are reloaded once per build.
+    """
+    global _jinja2_env
+    if _jinja2_env is not None and _jinja2_env[2][0] is config:
+        return _jinja2_env[1]
+    includes = os.path.join(os.path.abspath(config["source"]), "_includes")
+    key = (includes, tuple(_template_filters.items()))
+    if _jinja2_env is not None and _jinja2_env[0] == key:
+        env, current = _jinja2_env[1], _jinja2_env[2]
+        current[0] = config
+        if env.cache is not None:
+            for cache_key, t in list(env.cache.items()):
+                if not t.is_up_to_date:
+                    del env.cache[cache_key]
+        return env
+    from jinja2 import FileSystemLoader
+
+    loader = FileSystemLoader(includes)
+    env = tracking_environment()(loader=loader, auto_reload=False)
+    current = [config]
     for name, f in _template_filters.items():
-        env.filters[name] = lambda s: f(s, config)
+        env.filters[name] = lambda s, f=f: f(s, current[0])
+    _jinja2_templates.clear()
+    _jinja2_env = (key, env, current)
+    return env
+
+
+def jinja2_template(string: str, config: Config) -> "Jinja2Template":
+    env = jinja2_environment(config)
+    key = hashlib.sha1(string.encode(PAGE_ENCODING)).digest()
+    t = _jinja2_templates.get(key)
+    if t is not None:
+        _jinja2_templates.move_to_end(key)
+        return t
     t = env.from_string(string)
+    _jinja2_templates[key] = t
+    if len(_jinja2_templates) > cache_size(TEMPLATE_CACHE_SIZE, config):
+        _jinja2_templates.popitem(last=False)
+    return t
+
+
+@template_renderer
+def jinja2_render_string(string: str, context: dict[str, Any], config: Config) -> str:
+    t = jinja2_template(string, config)
     return t.render(**context)
 
 
-def read_template(path: str) -> Optional[Template]:
+class LazyContent:
+    """A reference to page content stored in a file, read on every access."""
+
+    def __init__(self, path: str, offset: int, digest: str) -> None:
+        self.path = path
+        self.offset = offset
+        self.digest = digest
+
+    def read(self) -> str:
+        with open(self.path, "rb") as fd:
+            fd.seek(self.offset)
+            return fd.read().decode(PAGE_ENCODING)
+
+    def __repr__(self) -> str:
+        return f"LazyContent({self.digest!r})"
+
+
+class LazyPage(dict):
+    """A page that reads its content from disk when the content is accessed.
+
+    Only the front matter of a page stays in memory in the low memory mode.
+    """
+
+    def __getitem__(self, key: Any) -> Any:
+        value = super().__getitem__(key)
+        if isinstance(value, LazyContent):
+            return value.read()
+        return value
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        return self[key] if key in self else default
+
+
+def peak_rss_kb() -> Optional[int]:
+    """Return the peak resident set size of the process if it is available."""
+    try:
+        import resource
+
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except (ImportError, AttributeError, OSError):
+        return None
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def content_file(data: bytes, config: Config) -> LazyContent:
+    """Store the content in the build cache, return a lazy reference to it."""
+    digest = hashlib.sha1(data).hexdigest()
+    directory = os.path.join(cache_directory(config), "content")
+    path = os.path.join(directory, digest)
+    if not os.path.exists(path):
+        make_dirs(directory)
+        write_file_atomic(path, data)
+    return LazyContent(os.path.abspath(path), 0, digest)
+
+
+def read_template(path: str, lazy: bool = False) -> Optional[Template]:
+    """Read a file with YAML front matter.
+
+    If `lazy` is true, the content is read from the file only when accessed.
+    """
     with open(path, "rb") as fd:
         if fd.read(3) != b"---":
             return None
-        lines = []
-        while True:
-            line = fd.readline()
-            if re.match(b"^---\r?\n", line):
-                break
-            elif line == b"":
-                return None
-            lines.append(line)
-        front_matter = BytesIO(b"".join(lines))
-        front_matter.name = path
-        page = yaml.safe_load(front_matter)
-        if not page:
-            page = {}
-        content = fd.read().decode(PAGE_ENCODING)
-        page["content"] = content
-        return page
-
-
-@loader
+        data = fd.read()
+    end = FRONT_MATTER_END.search(data)
+    if end is None:
+        return None
+    front_matter = BytesIO(data[: end.start() + 1])
+    front_matter.name = path
+    page = load_yaml(front_matter)
+    if not page:
+        page = {}
+    body = memoryview(data)[end.end() :]
+    if lazy:
+        digest = hashlib.sha1(body).hexdigest()
+        page = LazyPage(page)
+        offset = 3 + end.end()
+        page["content"] = LazyContent(os.path.abspath(path), offset, digest)
+        return cast(Template, page)
+    page["content"] = str(body, PAGE_ENCODING)
+    return page
+
+
+@loader(parallel=True)
 def load_page(path: str, config: Config) -> Optional[SiteContents]:
-    if not is_file_visible(path, config) or is_underscored(path):
+    if classify_path(path, config) != PATH_PAGE:
         return None
     name, suffix = os.path.splitext(path)
     if suffix in _file_filters:
         dst = f"{name}.html"
     else:
         dst = path
-    page = cast(Page, read_template(os.path.join(config["source"], path)))
+    lazy = bool(config.get("low_memory"))
+    page = cast(Page, read_template(os.path.join(config["source"], path), lazy))
     if not page:
         return None
     page["url"] = path2url(dst)
@@ -452,7 +1308,8 @@ def load_page(path: str, config: Config) -> Optional[SiteContents]:
 def read_post(
     path: str, date: datetime, title: str, config: Config
 ) -> Optional[SiteContents]:
-    post = cast(Post, read_template(os.path.join(config["source"], path)))
+    lazy = bool(config.get("low_memory"))
+    post = cast(Post, read_template(os.path.join(config["source"], path), lazy))
     if not post:
         return None
     if "date" in post:
@@ -475,109 +1332,731 @@ def read_post(
     }
 
 
-@loader
+@loader(parallel=True)
 def load_post(path: str, config: Config) -> Optional[SiteContents]:
-    post_re = re.compile(
-        r"(?P<year>\d{4})-(?P<month>\d{2})-(?P<day>\d{2})-" r"(?P<title>.+)"
-    )
-    parts = path.split(os.path.sep)
-    if "_posts" not in parts:
-        return None
-    if not is_file_visible(path, config):
+    if classify_path(path, config) != PATH_POST:
         return None
     name, _ = os.path.splitext(os.path.basename(path))
-    m = post_re.match(name)
+    m = POST_RE.match(name)
     if not m:
         return None
     date = datetime.strptime("{year}-{month}-{day}".format(**m.groupdict()), "%Y-%m-%d")
     return read_post(path, date, m.group("title"), config)
 
 
-@loader
+@loader(parallel=True)
 def load_draft(path: str, config: Config) -> Optional[SiteContents]:
     if not config.get("drafts"):
         return None
-    if "_drafts" not in path.split(os.path.sep):
-        return None
-    if not is_file_visible(path, config):
+    if classify_path(path, config) != PATH_DRAFT:
         return None
     title, _ = os.path.splitext(os.path.basename(path))
     return read_post(path, config.get("time", datetime.utcnow()), title, config)
 
 
+def layout_path(name: str, config: Config) -> str:
+    return os.path.join(config["source"], "_layouts", f"{name}.html")
+
+
+def load_layouts(config: Config) -> dict[str, Layout]:
+    """Read all the layouts and resolve their inheritance chains.
+
+    Missing parent layouts and inheritance cycles are reported here, before
+    any page is rendered.
+    """
+    layouts_dir = os.path.join(config["source"], "_layouts")
+    templates: dict[str, Template] = {}
+    for root, _, files in os.walk(layouts_dir):
+        for filename in files:
+            name, ext = os.path.splitext(filename)
+            if ext != ".html":
+                continue
+            rel_path = os.path.relpath(os.path.join(root, name), layouts_dir)
+            template = read_template(os.path.join(root, filename))
+            if template:
+                templates[rel_path.replace(os.path.sep, "/")] = template
+    layouts: dict[str, Layout] = {}
+    for name, template in templates.items():
+        chain = [template]
+        names = [name]
+        parent = template.get("layout", "nil")
+        while parent != "nil":
+            if parent in names:
+                cycle = " -> ".join(names + [parent])
+                raise Exception(f"Cyclic layout inheritance: {cycle}")
+            if parent not in templates:
+                raise Exception(
+                    f"Cannot load template: '{layout_path(parent, config)}'"
+                )
+            names.append(parent)
+            chain.append(templates[parent])
+            parent = templates[parent].get("layout", "nil")
+        layouts[name] = {"template": template, "chain": chain, "names": names}
+    return layouts
+
+
+def site_layouts(config: Config) -> dict[str, Layout]:
+    """Return the layouts of the site, loading them once per build."""
+    global _layouts
+    if _layouts is None or _layouts[0] is not config:
+        _layouts = (config, load_layouts(config))
+    return _layouts[1]
+
+
 def render_layout(content: str, template: Template, site: Site) -> str:
     name = template.get("layout", "nil")
     if name == "nil":
         return content
-    layout_file = os.path.join(site["source"], "_layouts", f"{name}.html")
-    layout = read_template(layout_file)
+    layout = site_layouts(site).get(name)
     if not layout:
-        raise Exception(f"Cannot load template: '{layout_file}'")
-    layout_copy = cast(dict, layout.copy())
-    page_copy = cast(dict, template.copy())
-    page_copy.pop("layout", None)
-    page_copy.pop("content", None)
-    layout_copy.update(page_copy)
-    layout = cast(Template, layout_copy)
-    context = {
-        "site": site,
-        "page": layout,
-        "content": content,
-    }
-    content = _render_string(layout["content"], context, site)
-    return render_layout(content, layout, site)
+        raise Exception(f"Cannot load template: '{layout_path(name, site)}'")
+    for layout_name in layout["names"]:
+        add_dependency("layouts", layout_name)
+    for layout_name, parent in zip(layout["names"], layout["chain"]):
+        layout_copy = cast(dict, parent.copy())
+        page_copy = cast(dict, template.copy())
+        page_copy.pop("layout", None)
+        page_copy.pop("content", None)
+        layout_copy.update(page_copy)
+        template = cast(Template, layout_copy)
+        context = {
+            "site": context_site(site),
+            "page": template,
+            "content": content,
+        }
+        content = profile_call(
+            "layout",
+            layout_name,
+            _render_string,
+            template["content"],
+            context,
+            site,
+        )
+    return content
 
 
 def render_page(page: Page, site: Site) -> str:
     context = {
-        "site": site,
+        "site": context_site(site),
         "page": page,
     }
     content = page["content"]
+    path = page.get("path", page["url"])
     if not page.get("raw_content", False):
-        content = _render_string(content, context, site)
+        content = profile_call("template", path, _render_string, content, context, site)
     f = _file_filters.get(file_suffix(page.get("path", "")))
     if f:
-        content = f(content, site)
+        content = profile_call("filter", None, f, content, site)
     page["content"] = content
     return render_layout(content, page, site)
 
 
 @processor
 def process_posts(site: Site) -> None:
-    """Sort and interlink posts."""
+    """Sort and interlink posts.
+
+    Posts of the resident site are kept sorted and linked while patching it.
+    """
     posts: list[Post] = site.setdefault("posts", [])
+    if resident_state(site) is not None:
+        return
     posts.sort(key=lambda p: p["date"], reverse=True)
-    n = len(posts)
-    for i, post in enumerate(posts):
-        if i < n - 1:
-            post["next"] = posts[i + 1]
-        if i > 0:
-            post["previous"] = posts[i - 1]
+    for i in range(len(posts)):
+        link_post(posts, i)
 
 
-def generate_page(page: Page, site: Site) -> None:
-    if not page.get("published", True):
+def link_post(posts: list[Post], i: int) -> None:
+    post = posts[i]
+    if i < len(posts) - 1:
+        post["next"] = posts[i + 1]
+    else:
+        post.pop("next", None)
+    if i > 0:
+        post["previous"] = posts[i - 1]
+    else:
+        post.pop("previous", None)
+
+
+def update_digest(
+    h: Any, obj: Any, nested: Callable[[dict], Optional[bytes]], stack: set[int]
+) -> None:
+    """Update a hash with a canonical representation of site data.
+
+    Dictionaries for which `nested` returns a digest are represented by this
+    digest instead of their contents.
+    """
+    if isinstance(obj, dict):
+        digest = nested(obj)
+        if digest is not None:
+            h.update(b"P" + digest)
+        elif id(obj) in stack:
+            h.update(b"C")
+        else:
+            stack.add(id(obj))
+            h.update(b"{")
+            for k in sorted(obj, key=str):
+                update_digest(h, k, nested, stack)
+                update_digest(h, obj[k], nested, stack)
+            h.update(b"}")
+            stack.discard(id(obj))
+    elif isinstance(obj, (list, tuple)):
+        if id(obj) in stack:
+            h.update(b"C")
+            return
+        stack.add(id(obj))
+        h.update(b"[")
+        for x in obj:
+            update_digest(h, x, nested, stack)
+        h.update(b"]")
+        stack.discard(id(obj))
+    else:
+        if isinstance(obj, str):
+            prefix, data = b"S", obj.encode(PAGE_ENCODING, "surrogatepass")
+        else:
+            prefix, data = b"R", repr(obj).encode(PAGE_ENCODING, "surrogatepass")
+        h.update(b"%s%d:" % (prefix, len(data)))
+        h.update(data)
+
+
+def source_digests(pages: list[Page]) -> dict[int, bytes]:
+    """Compute digests of pages by their IDs without next and previous links.
+
+    Pages nested in other pages (e.g. posts of tag pages) are represented by
+    their own digests.
+    """
+    known = {id(page): page for page in pages}
+    digests: dict[int, bytes] = {}
+    in_progress: set[int] = set()
+
+    def nested(d: dict) -> Optional[bytes]:
+        key = id(d)
+        if key not in known:
+            return None
+        elif key in digests:
+            return digests[key]
+        elif key in in_progress:
+            return b"C"
+        in_progress.add(key)
+        h = hashlib.sha1()
+        data = {k: v for k, v in d.items() if k not in ("next", "previous")}
+        update_digest(h, data, nested, set())
+        in_progress.discard(key)
+        digests[key] = h.digest()
+        return digests[key]
+
+    for page in pages:
+        nested(cast(dict, page))
+    return digests
+
+
+def files_digest(path: str) -> bytes:
+    h = hashlib.sha1()
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for filename in sorted(files):
+            file_path = os.path.join(root, filename)
+            h.update(os.path.relpath(file_path, path).encode(PAGE_ENCODING) + b"\0")
+            with open(file_path, "rb") as fd:
+                h.update(hashlib.sha1(fd.read()).digest())
+    return h.digest()
+
+
+class SiteView(dict):
+    """Site data that records the keys used while rendering a page."""
+
+    def __getitem__(self, key: Any) -> Any:
+        add_dependency("site", key)
+        return super().__getitem__(key)
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        add_dependency("site", key)
+        return super().get(key, default)
+
+    def __contains__(self, key: Any) -> bool:
+        add_dependency("site", key)
+        return super().__contains__(key)
+
+    def __iter__(self) -> Any:
+        add_dependency("site", "*")
+        return super().__iter__()
+
+    def keys(self) -> Any:
+        add_dependency("site", "*")
+        return super().keys()
+
+    def values(self) -> Any:
+        add_dependency("site", "*")
+        return super().values()
+
+    def items(self) -> Any:
+        add_dependency("site", "*")
+        return super().items()
+
+
+def add_dependency(kind: str, name: Any) -> None:
+    if _dependencies is not None and isinstance(name, str):
+        _dependencies[kind].add(name)
+
+
+def context_site(site: Site) -> Site:
+    """Return the site for template contexts that tracks its used keys."""
+    if _site_view is not None and _site_view[0] is site:
+        return cast(Site, _site_view[1])
+    return site
+
+
+def file_digest(path: str) -> bytes:
+    try:
+        with open(path, "rb") as fd:
+            return hashlib.sha1(fd.read()).digest()
+    except (FileNotFoundError, IsADirectoryError):
+        return b"-"
+
+
+def dependency_digest(kind: str, name: str, site: Site) -> bytes:
+    assert _build_state is not None
+    if kind == "site":
+        digests = _build_state["site_digests"]
+        if name not in digests:
+            h = hashlib.sha1()
+            data = site if name == "*" else site.get(name, b"-")
+            page_digests = _build_state["digests"]
+            update_digest(h, data, lambda d: page_digests.get(id(d)), set())
+            digests[name] = h.digest()
+        return digests[name]
+    digests = _build_state["file_digests"]
+    key = f"{kind}:{name}"
+    if key not in digests:
+        includes = os.path.join(site["source"], "_includes")
+        if kind == "layouts":
+            digests[key] = file_digest(layout_path(name, site))
+        elif name == "*":
+            digests[key] = files_digest(includes)
+        else:
+            digests[key] = file_digest(os.path.join(includes, *name.split("/")))
+    return digests[key]
+
+
+def page_key(page: Page, deps: Dependencies, site: Site) -> str:
+    """Compute a cache key of the page from its data and its dependencies."""
+    assert _build_state is not None
+    digests = _build_state["digests"]
+    h = hashlib.sha1(_build_state["common"])
+    h.update(digests.get(id(page), b"-"))
+    for link in ("next", "previous"):
+        linked = cast(dict, page).get(link)
+        h.update(digests.get(id(linked), b"-") if linked else b"-")
+    h.update(dependencies_digest(deps, site))
+    return h.hexdigest()
+
+
+def dependencies_digest(deps: Dependencies, site: Site) -> bytes:
+    """Return the digest of the dependencies, shared by pages with the same ones."""
+    assert _build_state is not None
+    digests = _build_state["deps_digests"]
+    key = tuple(tuple(cast(list[str], names)) for names in deps.values())
+    if key not in digests:
+        h = hashlib.sha1()
+        for kind, names in deps.items():
+            for name in cast(list[str], names):
+                h.update(f"{kind}:{name}\0".encode(PAGE_ENCODING))
+                h.update(dependency_digest(kind, name, site))
+        digests[key] = h.digest()
+    return digests[key]
+
+
+def start_page_keys(site: Site, pages: list[Page]) -> None:
+    """Compute digests of pages before any page is rendered.
+
+    Digests of the pages of the resident site are kept between builds.
+    """
+    global _site_view
+    if _build_state is None:
         return
-    url = page["url"]
-    dst = os.path.join(site["destination"], url2path(url))
-    make_dirs(os.path.dirname(dst))
-    with open(dst, "wb") as fd:
-        fd.truncate()
+    h = hashlib.sha1(_plugins_digest)
+    h.update(object_name(_render_string).encode(PAGE_ENCODING))
+    h.update(repr(site.get("markdown_extensions", [])).encode(PAGE_ENCODING))
+    with open(__file__, "rb") as fd:
+        h.update(fd.read())
+    _build_state["common"] = h.digest()
+    resident = resident_state(site)
+    if resident is not None:
+        digests = resident["digests"]
+        digests.update(source_digests([p for p in pages if id(p) not in digests]))
+        _build_state["digests"] = digests.copy()
+    else:
+        _build_state["digests"] = source_digests(pages)
+    _build_state["site_digests"] = {}
+    _build_state["deps_digests"] = {}
+    _site_view = (site, SiteView(site))
+
+
+def finish_page_group(pages: list[Page]) -> None:
+    """Make digests of generated pages depend on their rendered content.
+
+    Pages generated later see the rendered content of these pages instead of
+    their source content.
+    """
+    if _build_state is None:
+        return
+    digests, contents = _build_state["digests"], _build_state["contents"]
+    for page in pages:
+        content = contents.get(id(page))
+        if content is not None:
+            h = hashlib.sha1(digests[id(page)])
+            h.update(content.encode())
+            digests[id(page)] = h.digest()
+    _build_state["site_digests"] = {}
+    _build_state["deps_digests"] = {}
+
+
+def cache_directory(config: Config) -> str:
+    return os.path.join(config["source"], CACHE_DIR)
+
+
+def writable_cache_directory(config: Config) -> Optional[str]:
+    """Return the build cache directory, or None if it cannot be written.
+
+    Builds from a read-only source directory work without the build cache.
+    """
+    directory = cache_directory(config)
+    with contextlib.suppress(OSError):
+        make_dirs(directory)
+    if os.path.isdir(directory) and os.access(directory, os.W_OK):
+        return directory
+    info(f"Cannot write the build cache to '{directory}', building without it")
+    return None
+
+
+def empty_build_cache(config: Config, published: Optional[str] = None) -> BuildCache:
+    return {
+        "version": CACHE_VERSION,
+        "destination": os.path.abspath(published or config["destination"]),
+        "pages": {},
+        "files": [],
+    }
+
+
+def load_build_cache(
+    config: Config, published: Optional[str] = None
+) -> Optional[BuildCache]:
+    """Load the build cache, it is kept in memory for the resident site."""
+    resident = resident_state(cast(Site, config))
+    cache = resident["cache"] if resident is not None else None
+    if cache is None:
+        path = os.path.join(cache_directory(config), "build.json")
         try:
-            rendered = render_page(page, site)
+            with open(path, "rb") as fd:
+                cache = json.load(fd)
+        except (FileNotFoundError, ValueError):
+            return None
+    expected = empty_build_cache(config, published)
+    if not isinstance(cache, dict) or any(
+        cache.get(k) != expected[k] for k in ("version", "destination")  # type: ignore
+    ):
+        return None
+    return cast(BuildCache, cache)
+
+
+def save_build_cache(cache: BuildCache, config: Config) -> None:
+    directory = cache_directory(config)
+    make_dirs(directory)
+    data = json.dumps(cache).encode(PAGE_ENCODING)
+    write_file_atomic(os.path.join(directory, "build.json"), data)
+
+
+def destination_cache(
+    config: Config, existing: dict[str, tuple[int, int]]
+) -> BuildCache:
+    """Make a cache listing the existing destination files as static files.
+
+    Unchanged static files are kept and the rest is pruned after the build,
+    except for files written during the build by generators that don't use
+    `write_file()`. The `existing` dict is filled with the modification and
+    change times of the files to tell them apart.
+    """
+    cache = empty_build_cache(config)
+    destination = config["destination"]
+    marker = os.path.join(destination, ".obraz_destination")
+    for root, dirs, files in os.walk(destination):
+        for name in dirs:
+            path = os.path.join(root, name)
+            if os.path.islink(path):
+                os.remove(path)
+        for name in files:
+            path = os.path.join(root, name)
+            if path != marker:
+                rel_path = os.path.relpath(path, destination)
+                cache["files"].append(rel_path)
+                with contextlib.suppress(OSError):
+                    existing[rel_path] = output_stat(path)
+    return cache
+
+
+def output_stat(path: str) -> tuple[int, int]:
+    st = os.lstat(path)
+    return st.st_mtime_ns, st.st_ctime_ns
+
+
+def start_build_cache(
+    site: Site,
+    previous: Optional[BuildCache],
+    published: Optional[str] = None,
+    existing: Optional[dict[str, tuple[int, int]]] = None,
+    directory: Optional[str] = None,
+) -> None:
+    global _build_state
+    _build_state = {
+        "directory": directory,
+        "previous": previous or empty_build_cache(site, published),
+        "current": empty_build_cache(site, published),
+        "contents": {},
+        "changed": [],
+        "skipped": 0,
+        "common": b"",
+        "digests": {},
+        "site_digests": {},
+        "deps_digests": {},
+        "file_digests": {},
+        "existing": existing or {},
+    }
+
+
+def finish_build_cache(site: Site) -> None:
+    """Remove stale outputs of the previous build and save the cache."""
+    state = _build_state
+    if state is None:
+        return
+    previous, current = state["previous"], state["current"]
+    outputs = set(current["pages"]) | set(current["files"])
+    destination = site["destination"]
+    existing = state["existing"]
+    for rel_path in set(previous["pages"]) | set(previous["files"]):
+        if rel_path in outputs:
+            continue
+        path = os.path.join(destination, rel_path)
+        if rel_path in existing:
+            with contextlib.suppress(OSError):
+                if output_stat(path) != existing[rel_path]:
+                    continue
+        state["changed"].append(rel_path)
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+        parent = os.path.dirname(path)
+        with contextlib.suppress(OSError):
+            while os.path.realpath(parent) != os.path.realpath(destination):
+                os.rmdir(parent)
+                parent = os.path.dirname(parent)
+    resident = resident_state(site)
+    if resident is not None:
+        resident["contents"] = state["contents"]
+    if state["directory"] is None:
+        return
+    contents = {page["content"] for page in current["pages"].values()}
+    contents_dir = os.path.join(state["directory"], "content")
+    with contextlib.suppress(FileNotFoundError):
+        for name in os.listdir(contents_dir):
+            if name not in contents:
+                os.remove(os.path.join(contents_dir, name))
+    save_build_cache(current, site)
+    if resident is not None:
+        resident["cache"] = current
+
+
+def cached_page(
+    page: Page, rel_path: str, dst: str, site: Site
+) -> Optional[CachedPage]:
+    """Return the cache record for the page if its output is up to date."""
+    state = _build_state
+    if state is None:
+        return None
+    record = state["previous"]["pages"].get(rel_path)
+    if record is None or state["directory"] is None:
+        return None
+    if record["key"] != page_key(page, record["deps"], site):
+        return None
+    try:
+        st = os.stat(dst)
+        if st.st_size != record["size"] or st.st_mtime_ns != record["mtime"]:
+            return None
+        resident = resident_state(site)
+        rendered = resident["rendered"].get(id(page)) if resident else None
+        path = os.path.join(state["directory"], "content", record["content"])
+        if rendered is not None and rendered[0] == record["content"]:
+            page["content"] = rendered[1]
+        elif site.get("low_memory") and isinstance(page, LazyPage):
+            if not os.path.exists(path):
+                return None
+            lazy = LazyContent(os.path.abspath(path), 0, record["content"])
+            page["content"] = cast(str, lazy)
+        else:
+            with open(path, "rb") as fd:
+                page["content"] = fd.read().decode(PAGE_ENCODING)
+    except OSError:
+        return None
+    return record
+
+
+def record_page(
+    page: Page, dst: str, used: dict[str, set[str]], site: Site
+) -> Optional[CachedPage]:
+    state = _build_state
+    if state is None:
+        return None
+    deps: Dependencies = {
+        "layouts": sorted(used["layouts"]),
+        "includes": sorted(used["includes"]),
+        "site": sorted(used["site"]),
+    }
+    key = page_key(page, deps, site)
+    data = page["content"].encode(PAGE_ENCODING)
+    content = hashlib.sha1(data).hexdigest()
+    if state["directory"] is not None:
+        contents_dir = os.path.join(state["directory"], "content")
+        path = os.path.join(contents_dir, content)
+        if not os.path.exists(path):
+            make_dirs(contents_dir)
+            write_file_atomic(path, data)
+    st = os.stat(dst)
+    return {
+        "key": key,
+        "size": st.st_size,
+        "mtime": st.st_mtime_ns,
+        "content": content,
+        "deps": deps,
+    }
+
+
+def remember_page(page: Page, record: Optional[CachedPage], written: bool) -> None:
+    if _build_state is not None and record is not None:
+        rel_path = url2path(page["url"])
+        if written:
+            _build_state["changed"].append(rel_path)
+        else:
+            _build_state["skipped"] += 1
+        _build_state["current"]["pages"][rel_path] = record
+        _build_state["contents"][id(page)] = record["content"]
+
+
+def generate_page(page: Page, site: Site) -> tuple[Optional[CachedPage], bool]:
+    """Generate the page and return its cache record and if it was written."""
+    global _dependencies
+    if not page.get("published", True):
+        return None, False
+    rel_path = url2path(page["url"])
+    dst = os.path.join(site["destination"], rel_path)
+    record = cached_page(page, rel_path, dst, site)
+    written = False
+    if record is None:
+        used: dict[str, set[str]] = {"layouts": set(), "includes": set(), "site": set()}
+        if _render_string is not jinja2_render_string:
+            used["includes"].add("*")
+        _dependencies = used
+        try:
+            rendered = profile_call(
+                "page", page.get("path", page["url"]), render_page, page, site
+            )
         except Exception as e:
             raise Exception(f"Cannot render '{page.get('path')}': {e}")
-        fd.write(rendered.encode(PAGE_ENCODING))
+        finally:
+            _dependencies = None
+        written = write_output(rel_path, rendered.encode(PAGE_ENCODING), site)
+        del rendered
+        record = record_page(page, dst, used, site)
+        state = _build_state
+        cached = state is None or state["directory"] is not None
+        if cached and site.get("low_memory") and isinstance(page, LazyPage):
+            data = page["content"].encode(PAGE_ENCODING)
+            page["content"] = cast(str, content_file(data, site))
+    remember_page(page, record, written)
+    return record, written
+
+
+def jobs_count(config: Config) -> int:
+    jobs = int(config.get("jobs", 1))
+    if jobs <= 1:
+        return 1
+    import multiprocessing
+
+    if "fork" not in multiprocessing.get_all_start_methods():
+        return 1
+    if _memory_output is not None or _serving:
+        return 1
+    return max(jobs, 1)
+
+
+def generate_forked_pages(
+    indices: list[int],
+) -> tuple[list[tuple[int, str, Optional[CachedPage], bool]], list[ProfileEvent]]:
+    assert _forked_site is not None
+    site, pages = _forked_site
+    results = []
+    if _profile is not None:
+        del _profile[:]
+    for i in indices:
+        record, written = generate_page(pages[i], site)
+        content = dict.__getitem__(cast(dict, pages[i]), "content")
+        results.append((i, content, record, written))
+    return results, _profile or []
+
+
+def generate_pages_parallel(groups: list[list[Page]], site: Site) -> Iterable[Page]:
+    """Generate groups of pages one after another in forked worker processes.
+
+    The site is passed to the workers by forking, each group is forked
+    separately so it sees the rendered content of the previous groups. The
+    rendered content is sent back to the parent process.
+    """
+    global _forked_site
+    jobs = jobs_count(site)
+    import multiprocessing
+
+    context = multiprocessing.get_context("fork")
+    for pages in groups:
+        size = max(1, min(64, len(pages) // (jobs * 8)))
+        chunks = [
+            list(range(i, min(i + size, len(pages))))
+            for i in range(0, len(pages), size)
+        ]
+        _forked_site = (site, pages)
+        try:
+            with context.Pool(jobs) as pool:
+                for results, events in pool.imap(generate_forked_pages, chunks):
+                    if _profile is not None:
+                        _profile.extend(events)
+                    for i, content, record, written in results:
+                        pages[i]["content"] = content
+                        remember_page(pages[i], record, written)
+                        yield pages[i]
+        finally:
+            _forked_site = None
+        finish_page_group(pages)
+
+
+def generate_pages_serial(groups: list[list[Page]], site: Site) -> Iterable[Page]:
+    for pages in groups:
+        for page in pages:
+            generate_page(page, site)
+            yield page
+        finish_page_group(pages)
 
 
 @generator
 def generate_pages(site: Site) -> None:
     """Generate pages with YAML front matter."""
+    global _site_view
     posts = cast(list[Page], site.get("posts", []))
     pages = site.get("pages", [])
-    for page in progress("Generating pages", posts + pages):
-        generate_page(page, site)
+    start_page_keys(site, posts + pages)
+    if jobs_count(site) > 1:
+        rendered = generate_pages_parallel([posts, pages], site)
+    else:
+        rendered = generate_pages_serial([posts, pages], site)
+    try:
+        for _ in progress("Generating pages", rendered, len(posts) + len(pages)):
+            pass
+    finally:
+        _site_view = None
 
 
 @generator
@@ -585,84 +2064,813 @@ def generate_files(site: Site) -> None:
     """Copy static files."""
     for file_dict in site.get("files", []):
         src = os.path.join(site["source"], file_dict["path"])
-        dst = os.path.join(site["destination"], url2path(file_dict["url"]))
-        make_dirs(os.path.dirname(dst))
-        shutil.copy(src, dst)
+        rel_path = url2path(file_dict["url"])
+        copy_file(src, rel_path, site)
 
 
-def load_plugins(source: str) -> None:
-    plugins = sorted(glob(os.path.join(source, "_plugins", "*.py")))
-    n = 0
-    for plugin in plugins:
+def plugin_sources(source: str) -> list[tuple[str, bytes]]:
+    """Return the paths and the code of the plugins of the site."""
+    plugins = []
+    for plugin in sorted(glob(os.path.join(source, "_plugins", "*.py"))):
         with open(plugin, "rb") as fd:
-            code = fd.read()
+            plugins.append((plugin, fd.read()))
+    return plugins
+
+
+def plugins_digest(plugins: list[tuple[str, bytes]]) -> bytes:
+    h = hashlib.sha1()
+    for plugin, code in plugins:
+        h.update(os.path.basename(plugin).encode(PAGE_ENCODING) + b"\0")
+        h.update(hashlib.sha1(code).digest())
+    return h.digest()
+
+
+def load_plugins(source: str) -> None:
+    """Run the plugins of the site.
+
+    Cache keys of pages depend on the code of the plugins that was run, not on
+    the plugin files that may have changed since then.
+    """
+    global _plugins_digest
+    plugins = plugin_sources(source)
+    for plugin, code in plugins:
+        with profiled("plugin", os.path.basename(plugin)):
             exec(compile(code, plugin, "exec"), {})
-        n += 1
-    if n > 0:
-        info(f"Loaded {n} plugins")
+    _plugins_digest = plugins_digest(plugins)
+    if plugins:
+        info(f"Loaded {len(plugins)} plugins")
 
 
 def build(config: Config) -> None:
-    site = load_site(config)
-    generate_site(site)
+    publish_site(load_site(config))
 
 
-def build_delta(paths: Iterable[str], config: Config) -> None:
-    site = load_site_files(paths, config)
-    generate_site(site, clean=False)
+def publish_site(site: Site) -> list[str]:
+    """Generate the site, in a staging directory with the `atomic` option."""
+    if site.get("atomic"):
+        return generate_site_atomic(site)
+    else:
+        return generate_site(site)
 
 
-def load_site_files(paths: Iterable[str], config: Config) -> Site:
+def load_source_file(
+    path: str, config: Config, start: int = 0, stop: Optional[int] = None
+) -> Optional[SiteContents]:
+    for f in _loaders[start:stop]:
+        data = profile_call("loader", None, f, path, config)
+        if data:
+            return data
+    return None
+
+
+def parallel_loaders_count() -> int:
+    """Return the number of loaders tried first that are safe to run in parallel."""
+    for i, f in enumerate(_loaders):
+        if f not in _parallel_loaders:
+            return i
+    return len(_loaders)
+
+
+def load_forked_files(
+    indices: list[int],
+) -> tuple[list[Optional[SiteContents]], list[ProfileEvent]]:
+    assert _forked_loading is not None
+    config, paths, stop = _forked_loading
+    if _profile is not None:
+        del _profile[:]
+    results = [load_source_file(paths[i], config, 0, stop) for i in indices]
+    return results, _profile or []
+
+
+def load_source_files_parallel(
+    paths: list[str], config: Config
+) -> Iterable[tuple[str, Optional[SiteContents]]]:
+    """Load source files in forked worker processes in the order of paths.
+
+    The workers run only the parallel loaders tried first, files they skip are
+    passed to the rest of the loaders in the main process.
+    """
+    global _forked_loading
+    jobs = jobs_count(config)
+    stop = parallel_loaders_count()
+    import multiprocessing
+
+    context = multiprocessing.get_context("fork")
+    size = max(1, min(256, len(paths) // (jobs * 8)))
+    chunks = [
+        list(range(i, min(i + size, len(paths)))) for i in range(0, len(paths), size)
+    ]
+    _forked_loading = (config, paths, stop)
+    try:
+        with context.Pool(jobs) as pool:
+            forked = pool.imap(load_forked_files, chunks)
+            for indices, (results, events) in zip(chunks, forked):
+                if _profile is not None:
+                    _profile.extend(events)
+                for i, data in zip(indices, results):
+                    if not data:
+                        data = load_source_file(paths[i], config, stop)
+                    yield paths[i], data
+    finally:
+        _forked_loading = None
+
+
+def load_source_files(paths: Iterable[str], config: Config) -> dict[str, SiteContents]:
+    """Load source files into a dict of their contents by relative paths.
+
+    With several jobs the files are read by parallel loaders in worker
+    processes, the result is the same as when they are loaded one by one.
+    """
     source = config["source"]
     info("Loading source files...")
-    site = cast(SiteContents, config.copy())
-    n = 0
+    rel_paths = [os.path.relpath(path, source) for path in paths]
+    loaded = {}
+    with profiled("phase", "Loading source files"):
+        if jobs_count(config) > 1 and parallel_loaders_count() > 0:
+            items = load_source_files_parallel(rel_paths, config)
+        else:
+            items = ((path, load_source_file(path, config)) for path in rel_paths)
+        for rel_path, data in items:
+            if data:
+                loaded[rel_path] = data
+    info(f"Loaded {len(loaded)} files")
+    return loaded
+
+
+def update_source_files(
+    loaded: dict[str, SiteContents], paths: Iterable[str], config: Config
+) -> None:
+    """Reload changed, new and deleted source files in place."""
+    source = config["source"]
     for path in paths:
         rel_path = os.path.relpath(path, source)
-        for f in _loaders:
-            data = f(rel_path, config)
-            if data:
-                n += 1
-                site = merge(site, data)
-                break
-    info(f"Loaded {n} files")
-    return cast(Site, site)
+        data = load_source_file(rel_path, config) if os.path.isfile(path) else None
+        if data:
+            loaded[rel_path] = data
+            continue
+        loaded.pop(rel_path, None)
+        prefix = rel_path + os.path.sep
+        for name in [name for name in loaded if name.startswith(prefix)]:
+            del loaded[name]
+
+
+def assemble_site(contents: Iterable[SiteContents], config: Config) -> Site:
+    acc: dict = {}
+    for data in contents:
+        merge_into(acc, cast(dict, data))
+    return cast(Site, merge(cast(dict, config.copy()), acc))
+
+
+def copy_site_contents(x: _T, memo: Optional[dict[int, Any]] = None) -> _T:
+    """Copy dicts and lists of site contents keeping references between them."""
+    if memo is None:
+        memo = {}
+    if not isinstance(x, (dict, list)):
+        return x
+    elif id(x) in memo:
+        return memo[id(x)]
+    elif isinstance(x, dict):
+        d: dict = LazyPage() if isinstance(x, LazyPage) else {}
+        memo[id(x)] = d
+        for k, v in dict.items(x):
+            d[k] = copy_site_contents(v, memo)
+        return cast(_T, d)
+    else:
+        xs: list = []
+        memo[id(x)] = xs
+        xs.extend(copy_site_contents(v, memo) for v in x)
+        return cast(_T, xs)
+
+
+def empty_resident_site(config: Config) -> ResidentSite:
+    return {
+        "config": config,
+        "loaded": {},
+        "site": None,
+        "copies": {},
+        "owners": {},
+        "order": {},
+        "sources": {},
+        "digests": {},
+        "contents": {},
+        "rendered": {},
+        "cache": None,
+    }
+
+
+def update_resident_site(resident: ResidentSite, paths: Iterable[str]) -> None:
+    """Reload changed source files and patch their entries in the resident site.
+
+    All the source files are loaded the first time. The site is assembled again
+    if the changed files add site data other than posts, pages, files and tags.
+    """
+    config = resident["config"]
+    loaded = resident["loaded"]
+    source = os.path.abspath(config["source"])
+    if not loaded:
+        destination = os.path.abspath(config["destination"])
+        paths = all_source_files(source, destination, config)
+        resident["loaded"] = load_source_files(paths, config)
+        resident["site"] = None
+        return
+    paths = list(paths)
+    names = []
+    for path in paths:
+        name = os.path.relpath(path, source)
+        names.append(name)
+        if not os.path.isfile(path):
+            prefix = name + os.path.sep
+            names.extend(other for other in loaded if other.startswith(prefix))
+    try:
+        update_source_files(loaded, paths, config)
+    finally:
+        site, resident["site"] = resident["site"], None
+        if site is not None and patch_resident_site(resident, site, names):
+            resident["site"] = site
+
+
+def patch_resident_site(resident: ResidentSite, site: Site, names: list[str]) -> bool:
+    """Replace the entries of the changed source files in the site.
+
+    Only the neighbours of changed posts are linked again. Returns false if the
+    site has to be assembled again.
+    """
+    config, loaded, copies = resident["config"], resident["loaded"], resident["copies"]
+    names = list(dict.fromkeys(names))
+    for name in names:
+        for data in (copies.get(name), loaded.get(name)):
+            if data and any(k not in ENTRY_KEYS or k in config for k in data):
+                return False
+    order, owners = resident["order"], resident["owners"]
+    linked: list[Post] = []
+    for name in names:
+        old = copies.pop(name, None)
+        if old:
+            remove_entries(resident, site, old, linked)
+        if name not in loaded:
+            order.pop(name, None)
+            continue
+        if name not in order:
+            order[name] = next(reversed(order.values()), -1) + 1
+        copies[name] = copy_site_contents(loaded[name])
+        add_entries(resident, site, name, copies[name], linked)
+    posts = site["posts"]
+    for post in linked:
+        if id(post) in owners:
+            i = entry_index(posts, post, resident, True)
+            for j in range(max(i - 1, 0), min(i + 2, len(posts))):
+                link_post(posts, j)
+    tags = site.get("tags")
+    if tags:
+
+        def first_seen(tag: str) -> tuple[int, int]:
+            name = owners[id(tags[tag][0])]
+            return order[name], list(copies[name]["tags"]).index(tag)
+
+        items = sorted(tags.items(), key=lambda item: first_seen(item[0]))
+        tags.clear()
+        tags.update(items)
+    return True
+
+
+def entry_position(xs: list, entry: Any, resident: ResidentSite, by_date: bool) -> int:
+    """Return the index in a list of the site where the entry goes.
+
+    Entries are in the order of their source files, posts are sorted by date
+    first, as in an assembled site.
+    """
+    order, owners = resident["order"], resident["owners"]
+    i = order[owners[id(entry)]]
+    date = entry["date"] if by_date else None
+    lo, hi = 0, len(xs)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        other = xs[mid]
+        if by_date and other["date"] != date:
+            after = other["date"] < date
+        else:
+            after = order[owners[id(other)]] > i
+        if after:
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo
+
+
+def entry_index(xs: list, entry: Any, resident: ResidentSite, by_date: bool) -> int:
+    i = entry_position(xs, entry, resident, by_date) - 1
+    while xs[i] is not entry:
+        i -= 1
+    return i
+
+
+def resident_entries(data: SiteContents) -> Iterable[dict]:
+    contents = cast(dict, data)
+    for key in ("posts", "pages", "files"):
+        yield from contents.get(key, [])
+    for tagged in contents.get("tags", {}).values():
+        yield from tagged
+
+
+def remove_entries(
+    resident: ResidentSite, site: Site, old: SiteContents, linked: list[Post]
+) -> None:
+    data, contents = cast(dict, site), cast(dict, old)
+    for key in ("posts", "pages", "files"):
+        xs = data.get(key, [])
+        for entry in contents.get(key, []):
+            i = entry_index(xs, entry, resident, key == "posts")
+            del xs[i]
+            if key == "posts":
+                linked.extend(xs[max(i - 1, 0) : i + 1])
+    tags = data.get("tags", {})
+    for tag, tagged in contents.get("tags", {}).items():
+        xs = tags[tag]
+        for entry in tagged:
+            del xs[entry_index(xs, entry, resident, False)]
+        if not xs:
+            del tags[tag]
+    for entry in resident_entries(old):
+        resident["owners"].pop(id(entry), None)
+        resident["sources"].pop(id(entry), None)
+        resident["digests"].pop(id(entry), None)
+
+
+def add_entries(
+    resident: ResidentSite,
+    site: Site,
+    name: str,
+    new: SiteContents,
+    linked: list[Post],
+) -> None:
+    data, contents = cast(dict, site), cast(dict, new)
+    for entry in resident_entries(new):
+        resident["owners"][id(entry)] = name
+    for key in ("posts", "pages"):
+        for entry in contents.get(key, []):
+            resident["sources"][id(entry)] = dict.get(entry, "content")
+    for key in ("posts", "pages", "files"):
+        if key not in contents:
+            continue
+        xs = data.setdefault(key, [])
+        for entry in contents[key]:
+            xs.insert(entry_position(xs, entry, resident, key == "posts"), entry)
+            if key == "posts":
+                linked.append(entry)
+    if "tags" in contents:
+        tags = data.setdefault("tags", {})
+        for tag, tagged in contents["tags"].items():
+            xs = tags.setdefault(tag, [])
+            for entry in tagged:
+                xs.insert(entry_position(xs, entry, resident, False), entry)
+
+
+def assemble_resident_site(resident: ResidentSite) -> Site:
+    """Assemble the site from copies of the loaded source files, sort its posts."""
+    loaded = resident["loaded"]
+    copies = {name: copy_site_contents(data) for name, data in loaded.items()}
+    site = assemble_site(copies.values(), resident["config"])
+    resident["site"] = None
+    process_posts(site)
+    resident["site"] = site
+    resident["copies"] = copies
+    resident["owners"] = {}
+    resident["order"] = {name: i for i, name in enumerate(copies)}
+    resident["sources"] = {}
+    resident["digests"] = {}
+    resident["contents"] = {}
+    resident["rendered"] = {}
+    for name, data in copies.items():
+        for entry in resident_entries(data):
+            resident["owners"][id(entry)] = name
+        for key in ("posts", "pages"):
+            for entry in cast(dict, data).get(key, []):
+                resident["sources"][id(entry)] = dict.get(entry, "content")
+    return site
+
+
+def resident_site(resident: ResidentSite) -> Site:
+    """Return the resident site for generating it.
+
+    Pages get their source content back, their rendered content is used for
+    pages with unchanged cache keys. Plugin processors may change any site
+    data, with them the site is assembled from the loaded files every time.
+    """
+    global _resident
+    _resident = None
+    builtin = (process_posts, generate_pages, generate_files)
+    if any(f not in builtin for f in _processors):
+        resident["site"] = None
+        memo: dict[int, Any] = {}
+        contents = (copy_site_contents(d, memo) for d in resident["loaded"].values())
+        return assemble_site(contents, resident["config"])
+    site = resident["site"]
+    if site is None:
+        site = assemble_resident_site(resident)
+    else:
+        sources, digests = resident["sources"], resident["contents"]
+        rendered = {}
+        pages = cast(list[dict], site["posts"]) + cast(
+            list[dict], site.get("pages", [])
+        )
+        for page in pages:
+            content = dict.get(page, "content")
+            if content is not sources[id(page)]:
+                dict.__setitem__(page, "content", sources[id(page)])
+                if id(page) in digests:
+                    rendered[id(page)] = (digests[id(page)], content)
+        resident["rendered"] = rendered
+    resident["contents"] = {}
+    _resident = resident
+    return cast(Site, dict(site))
+
+
+def resident_state(site: Site) -> Optional[ResidentSite]:
+    """Return the resident state if the site is generated from it."""
+    resident = _resident
+    if resident is None or resident["site"] is None:
+        return None
+    posts = cast(dict, site).get("posts")
+    return resident if posts is resident["site"]["posts"] else None
+
+
+def load_site_files(paths: Iterable[str], config: Config) -> Site:
+    return assemble_site(load_source_files(paths, config).values(), config)
 
 
 def load_site(config: Config) -> Site:
-    paths = all_source_files(config["source"], config["destination"])
+    paths = all_source_files(config["source"], config["destination"], config)
     return load_site_files(paths, config)
 
 
-def generate_site(site: Site, clean: bool = True) -> None:
-    destination = site["destination"]
+def run_processors(site: Site) -> None:
+    for f in _processors:
+        msg = object_name(f)
+        info(f"{msg}...")
+        category = "generator" if f in _generators else "processor"
+        profile_call(category, msg, f, site)
+
+
+def check_destination(destination: str, config: Config) -> None:
     marker = os.path.join(destination, ".obraz_destination")
     write_denied = os.path.exists(destination) and not os.path.exists(marker)
-    if write_denied and not site.get("force"):
+    if write_denied and not config.get("force"):
         raise Exception(
             f"Use --force to overwrite the contents "
             f"of '{destination}' not marked as destination "
             f"directory yet"
         )
+
+
+def generations_directory(destination: str) -> str:
+    parent, name = os.path.split(os.path.abspath(destination))
+    return os.path.join(parent, f".{name}.generations")
+
+
+def link_tree(src: str, dst: str) -> None:
+    """Recreate src in dst with hard links to its files, or copies if needed."""
+    for root, _, files in os.walk(src):
+        target = os.path.join(dst, os.path.relpath(root, src))
+        make_dirs(target)
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                os.link(path, os.path.join(target, name))
+            except OSError:
+                shutil.copy2(path, os.path.join(target, name))
+
+
+def publish_directory(staging: str, destination: str, generations: str) -> None:
+    """Make the destination point to the staging directory.
+
+    The destination becomes a symlink that is replaced atomically. The new
+    symlink is created in the generations directory, so it isn't seen as a
+    source file. If the destination is a directory, it is moved to the
+    generations directory first. Without symlinks the directories are swapped
+    by renaming.
+    """
+    if os.path.isdir(destination) and not os.path.islink(destination):
+        name = datetime.utcnow().strftime("%Y%m%d%H%M%S%f")
+        os.rename(destination, os.path.join(generations, name))
+    tmp = os.path.join(generations, f".{os.getpid()}.tmp")
+    try:
+        os.symlink(os.path.relpath(staging, os.path.dirname(destination)), tmp)
+    except (OSError, NotImplementedError):
+        os.rename(staging, destination)
+        return
+    os.replace(tmp, destination)
+
+
+def generate_site_atomic(site: Site) -> list[str]:
+    """Generate the site in a staging directory and publish it at once.
+
+    Each build is a new generation in the `.<destination>.generations`
+    directory next to the destination, the destination is a symlink to the
+    current one. Unchanged files are hard links to the files of the previous
+    generation. The `keep` option is the number of previous generations kept
+    for rolling back by changing the symlink.
+    """
+    destination = os.path.abspath(site["destination"])
+    check_destination(destination, site)
+    generations = generations_directory(destination)
+    make_dirs(generations)
+    name = datetime.utcnow().strftime("%Y%m%d%H%M%S%f")
+    staging = os.path.join(generations, name)
+    if os.path.isdir(destination):
+        link_tree(os.path.realpath(destination), staging)
+    site["destination"] = staging
+    try:
+        changed = generate_site(site, published=destination)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    finally:
+        site["destination"] = destination
+    publish_directory(staging, destination, generations)
+    current = os.path.realpath(destination)
+    previous = [
+        path
+        for path in sorted(os.listdir(generations))
+        if os.path.join(generations, path) != current
+    ]
+    keep = int(site.get("keep", 1))
+    for path in previous[: max(len(previous) - keep, 0)]:
+        shutil.rmtree(os.path.join(generations, path), ignore_errors=True)
+    info(f"Published {os.path.relpath(current, os.path.dirname(destination))}")
+    return changed
+
+
+def generate_site(
+    site: Site,
+    output: Optional[dict[str, Union[bytes, str]]] = None,
+    published: Optional[str] = None,
+) -> list[str]:
+    """Generate the site and return the paths of changed destination files.
+
+    If `published` is given, the destination is a staging directory that is
+    going to be published there, the build cache is kept for that directory.
+
+    If `output` is given, the site is generated into it instead of the
+    destination directory as a dict of URLs to the contents of pages or to the
+    paths of static files. The build cache isn't used then.
+    """
+    global _build_state, _memory_output
+    if output is not None:
+        site_layouts(site)
+        _memory_output = output
+        try:
+            run_processors(site)
+        finally:
+            _memory_output = None
+        info("Site generated successfully")
+        return []
+    destination = site["destination"]
+    marker = os.path.join(destination, ".obraz_destination")
+    check_destination(destination, site)
+    site_layouts(site)
     make_dirs(destination)
-    if clean:
-        for name in os.listdir(destination):
-            remove(os.path.join(destination, name))
+    directory = writable_cache_directory(site)
+    previous = None
+    if directory is not None and not site.get("clean"):
+        previous = load_build_cache(site, published)
+    existing: dict[str, tuple[int, int]] = {}
+    if previous is None:
+        previous = destination_cache(site, existing)
+    if not os.path.exists(marker):
         with open(marker, "wb"):
             pass
-    for f in _processors:
-        msg = object_name(f)
-        info(f"{msg}...")
-        f(site)
+    start_build_cache(site, previous, published, existing, directory)
+    try:
+        run_processors(site)
+        finish_build_cache(site)
+        changed = []
+        if _build_state is not None:
+            changed = _build_state["changed"]
+            written = len(_build_state["current"]["files"]) + len(
+                _build_state["current"]["pages"]
+            )
+            written -= _build_state["skipped"]
+            info(f"Wrote {written} files, skipped {_build_state['skipped']} unchanged")
+    finally:
+        _build_state = None
+    if site.get("low_memory"):
+        rss = peak_rss_kb()
+        if rss is not None:
+            info(f"Peak memory usage: {rss} KB")
     info("Site generated successfully")
+    return changed
+
+
+class LiveReload:
+    """Broadcast lists of changed URLs to the browsers connected to the server."""
+
+    history = 16
+
+    def __init__(self) -> None:
+        from threading import Condition
+
+        self.condition = Condition()
+        self.events: list[tuple[int, list[str]]] = []
+
+    def notify(self, urls: list[str]) -> None:
+        with self.condition:
+            n = self.events[-1][0] + 1 if self.events else 1
+            self.events.append((n, urls))
+            del self.events[: -self.history]
+            self.condition.notify_all()
+
+    def last_event(self) -> int:
+        with self.condition:
+            return self.events[-1][0] if self.events else 0
+
+    def wait(self, after: int, timeout: float) -> tuple[int, list[str]]:
+        """Wait for the URLs changed after the given event number."""
+        with self.condition:
+            self.condition.wait_for(lambda: self.last_event() > after, timeout)
+            urls = [url for n, xs in self.events if n > after for url in xs]
+            return self.last_event(), urls
+
+
+LIVE_RELOAD_PATH = "/__obraz/events"
+LIVE_RELOAD_SCRIPT = """<script>
+(function () {
+  var source = new EventSource("%s");
+  source.onmessage = function (event) {
+    var urls = JSON.parse(event.data);
+    var used = [location.pathname];
+    var elements = document.querySelectorAll("link[href], script[src], img[src]");
+    for (var i = 0; i < elements.length; i++) {
+      var url = elements[i].href || elements[i].src;
+      used.push(new URL(url, location.href).pathname);
+    }
+    for (var j = 0; j < urls.length; j++) {
+      if (used.indexOf(urls[j]) >= 0) {
+        source.close();
+        location.reload();
+        return;
+      }
+    }
+  };
+})();
+</script>
+""" % (
+    LIVE_RELOAD_PATH
+)
+
+
+def changed_outputs(
+    old: dict[str, Union[bytes, str]],
+    new: dict[str, Union[bytes, str]],
+    sources: Iterable[str],
+) -> list[str]:
+    """Return the destination paths that differ between two in-memory outputs.
+
+    Static files are compared by their source paths, so the changed source
+    files are needed too.
+    """
+    changed = {os.path.abspath(path) for path in sources}
+    urls = [url for url, data in new.items() if old.get(url) != data or data in changed]
+    urls.extend(url for url in old if url not in new)
+    return [url[1:].replace("/", os.path.sep) for url in urls]
+
+
+def changed_urls(paths: Iterable[str], config: Config) -> list[str]:
+    """Return the URLs of the destination paths, including directory URLs."""
+    baseurl = config["baseurl"].rstrip("/")
+    urls = []
+    for path in paths:
+        url = baseurl + pathname2url(os.path.sep + path)
+        urls.append(url)
+        m = re.match(r"(.*/)index.html?$", url)
+        if m:
+            urls.append(m.group(1))
+    return urls
+
+
+def file_etag(fd: BinaryIO, path: str) -> str:
+    """Return a strong ETag of the file contents cached by its size and mtime."""
+    st = os.fstat(fd.fileno())
+    cached = _etags.get(path)
+    if cached and cached[:2] == (st.st_size, st.st_mtime_ns):
+        return cached[2]
+    h = hashlib.sha1()
+    for chunk in iter(lambda: fd.read(CHUNK_SIZE), b""):
+        h.update(chunk)
+    fd.seek(0)
+    etag = f'"{h.hexdigest()}"'
+    _etags[path] = (st.st_size, st.st_mtime_ns, etag)
+    return etag
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    tags = [tag.strip() for tag in header.split(",")]
+    return any(tag == "*" or tag.removeprefix("W/") == etag for tag in tags)
+
+
+def byte_range(header: str, size: int) -> Optional[tuple[int, int]]:
+    """Parse a single byte range into a pair of offset and length.
+
+    Returns None if the header should be ignored, raises ValueError if the
+    range is not satisfiable.
+    """
+    m = re.match(r"bytes=(\d*)-(\d*)$", header.strip())
+    if not m or not any(m.groups()):
+        return None
+    first, last = m.groups()
+    if not first:
+        start = max(size - int(last), 0)
+        end = size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if last and int(last) < start:
+            return None
+    if start >= size or end < start:
+        raise ValueError(f"Range not satisfiable: {header}")
+    return start, end - start + 1
+
+
+class SiteServer(_HTTPServer):
+    """The base class of HTTP servers made by `make_server()`.
+
+    The actual server class is made together with the server, so `http.server`
+    is imported only when the site is served.
+    """
+
+    daemon_threads = True
+    directory: str
+    files: Optional[dict[str, Union[bytes, str]]]
+
+
+def make_server(config: Config, live_reload: Optional[LiveReload] = None) -> SiteServer:
+    """Make a threaded HTTP server for the destination directory.
+
+    The server doesn't change the current directory, so it can keep serving
+    while the site is being rebuilt. Its `directory` attribute can be
+    switched to another directory at any time.
 
+    With the `memory` option the server serves the in-memory output of
+    `generate_site()` stored in its `files` attribute, which can be replaced
+    with the output of another build at any time.
 
-def make_server(config: Config) -> HTTPServer:
+    With the `origin` option the server sends strong ETags based on the file
+    contents, answers conditional and single range requests, keeps
+    connections alive and sends file bodies with `os.sendfile()`.
+
+    If `live_reload` is given, the server streams the changed URLs as
+    Server-Sent Events and injects a script that listens to them into HTML
+    pages it serves.
+    """
     host = config["host"]
     port = int(config["port"])
     baseurl = config["baseurl"]
+    origin = bool(config.get("origin"))
+    memory = bool(config.get("memory"))
+    from email.utils import parsedate_to_datetime
+    from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+    class Server(SiteServer, ThreadingHTTPServer):
+        pass
 
     class Handler(SimpleHTTPRequestHandler):
+        body_range = (0, 0)
+        if origin:
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+        def __init__(
+            self, request: Any, client_address: Any, server: SiteServer
+        ) -> None:
+            self.files = server.files
+            super().__init__(
+                request, client_address, server, directory=server.directory
+            )
+
+        def do_GET(self) -> None:
+            if live_reload and self.path == LIVE_RELOAD_PATH:
+                self.send_events(live_reload)
+            else:
+                super().do_GET()
+
+        def send_events(self, live_reload: LiveReload) -> None:
+            n = live_reload.last_event()
+            self.close_connection = True
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            try:
+                while True:
+                    n, urls = live_reload.wait(n, timeout=15)
+                    if urls:
+                        data = f"data: {json.dumps(urls)}\n\n"
+                    else:
+                        data = ": ping\n\n"
+                    self.wfile.write(data.encode(PAGE_ENCODING))
+                    self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
         def send_head(self) -> Union[BytesIO, BinaryIO, None]:
             if not self.path.startswith(baseurl):
                 self.send_error(404, "File not found")
@@ -670,49 +2878,400 @@ def make_server(config: Config) -> HTTPServer:
             self.path = self.path[len(baseurl) :]
             if not self.path.startswith("/"):
                 self.path = "/" + self.path
+            if self.files is not None:
+                return self.send_memory_head(self.files)
+            if live_reload:
+                f = self.send_live_reload_page()
+                if f:
+                    return f
+            if origin:
+                return self.send_origin_head()
             return SimpleHTTPRequestHandler.send_head(self)
 
-    return HTTPServer((host, port), Handler)
+        def send_memory_head(
+            self, files: dict[str, Union[bytes, str]]
+        ) -> Union[BytesIO, BinaryIO, None]:
+            url = unquote(urlsplit(self.path).path)
+            if url.endswith("/"):
+                url += "index.html"
+            data = files.get(url)
+            if data is None:
+                if url + "/index.html" in files:
+                    self.send_response(301)
+                    self.send_header("Location", baseurl + url + "/")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                else:
+                    self.send_error(404, "File not found")
+                return None
+            if isinstance(data, bytes):
+                return self.send_data(data, url)
+            fd = open(data, "rb")
+            try:
+                if origin:
+                    return self.send_file_head(fd, data)
+                size = os.fstat(fd.fileno()).st_size
+                self.body_range = (0, size)
+                self.send_response(200)
+                self.send_header("Content-Type", self.guess_type(data))
+                self.send_header("Content-Length", str(size))
+                self.end_headers()
+                return fd
+            except BaseException:
+                fd.close()
+                raise
+
+        def send_data(self, data: bytes, path: str) -> BytesIO:
+            if live_reload and path.endswith((".html", ".htm")):
+                script = LIVE_RELOAD_SCRIPT.encode(PAGE_ENCODING)
+                pos = data.lower().rfind(b"</body>")
+                if pos < 0:
+                    pos = len(data)
+                data = data[:pos] + script + data[pos:]
+            self.send_response(200)
+            self.send_header("Content-Type", self.guess_type(path))
+            self.send_header("Content-Length", str(len(data)))
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            return BytesIO(data)
+
+        def send_origin_head(self) -> Optional[BinaryIO]:
+            path = self.translate_path(self.path)
+            if os.path.isdir(path):
+                index = os.path.join(path, "index.html")
+                if not self.path.split("?")[0].endswith("/") or not os.path.isfile(
+                    index
+                ):
+                    return SimpleHTTPRequestHandler.send_head(self)
+                path = index
+            if path.endswith("/") or not os.path.isfile(path):
+                self.send_error(404, "File not found")
+                return None
+            fd = open(path, "rb")
+            try:
+                return self.send_file_head(fd, path)
+            except BaseException:
+                fd.close()
+                raise
+
+        def send_file_head(self, fd: BinaryIO, path: str) -> Optional[BinaryIO]:
+            st = os.fstat(fd.fileno())
+            size = st.st_size
+            mtime = int(st.st_mtime)
+            etag = file_etag(fd, path)
+            last_modified = self.date_time_string(mtime)
+            if self.not_modified(etag, mtime):
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Last-Modified", last_modified)
+                self.end_headers()
+                fd.close()
+                return None
+            self.body_range = (0, size)
+            header = self.headers.get("Range")
+            if_range = self.headers.get("If-Range")
+            if header and if_range not in (None, etag, last_modified):
+                header = None
+            try:
+                r = byte_range(header, size) if header else None
+            except ValueError:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                fd.close()
+                return None
+            if r:
+                self.body_range = r
+                self.send_response(206)
+                start, length = r
+                end = start + length - 1
+                self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+            else:
+                self.send_response(200)
+            self.send_header("Content-Type", self.guess_type(path))
+            self.send_header("Content-Length", str(self.body_range[1]))
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", last_modified)
+            self.send_header("Accept-Ranges", "bytes")
+            self.end_headers()
+            return fd
+
+        def not_modified(self, etag: str, mtime: int) -> bool:
+            if_none_match = self.headers.get("If-None-Match")
+            if if_none_match:
+                return etag_matches(if_none_match, etag)
+            if_modified_since = self.headers.get("If-Modified-Since")
+            if if_modified_since:
+                try:
+                    since = parsedate_to_datetime(if_modified_since)
+                except (TypeError, ValueError):
+                    return False
+                return mtime <= since.timestamp()
+            return False
+
+        def copyfile(self, source: Any, outputfile: Any) -> None:
+            if not origin or isinstance(source, BytesIO):
+                return super().copyfile(source, outputfile)
+            offset, count = self.body_range
+            if not hasattr(os, "sendfile"):
+                source.seek(offset)
+                while count > 0:
+                    chunk = source.read(min(count, CHUNK_SIZE))
+                    if not chunk:
+                        break
+                    outputfile.write(chunk)
+                    count -= len(chunk)
+                return
+            out = self.connection.fileno()
+            while count > 0:
+                sent = os.sendfile(out, source.fileno(), offset, count)
+                if sent == 0:
+                    break
+                offset += sent
+                count -= sent
+
+        def send_live_reload_page(self) -> Optional[BytesIO]:
+            path = self.translate_path(self.path)
+            if os.path.isdir(path) and self.path.split("?")[0].endswith("/"):
+                path = os.path.join(path, "index.html")
+            if not path.endswith((".html", ".htm")):
+                return None
+            try:
+                with open(path, "rb") as fd:
+                    data = fd.read()
+            except OSError:
+                return None
+            return self.send_data(data, path)
+
+    server = Server((host, port), Handler)
+    server.directory = os.path.abspath(config["destination"])
+    server.files = {} if memory else None
+    return server
 
 
 def serve(config: Config) -> None:
-    build(config)
     server = make_server(config)
-    os.chdir(config["destination"])
+    if server.files is not None:
+        generate_site(load_site(config), output=server.files)
+    else:
+        build(config)
     log_serving(config)
     server.serve_forever()
 
 
+def publish_served_site(
+    site: Site, server: SiteServer, sources: list[str]
+) -> list[str]:
+    """Generate the site for the server and return the changed paths.
+
+    With the `memory` option or with `--atomic` the server is switched to the
+    new site once it is complete, so a request never gets a mix of pages from
+    different builds. Otherwise the destination is updated in place.
+    """
+    if server.files is not None:
+        files: dict[str, Union[bytes, str]] = {}
+        generate_site(site, output=files)
+        changed = changed_outputs(server.files, files, sources)
+        server.files = files
+        return changed
+    if not site.get("atomic"):
+        return generate_site(site)
+    changed = generate_site_atomic(site)
+    server.directory = os.path.realpath(site["destination"])
+    return changed
+
+
 def watch(config: Config) -> None:
+    """Serve the site and rebuild it when source files change.
+
+    The site is kept in memory between rebuilds, only the entries of the
+    changed source files are replaced in it, see `update_resident_site()`.
+    Pages with unchanged cache keys are not rendered again.
+    """
+    global _serving
     source = os.path.abspath(config["source"])
     destination = os.path.abspath(config["destination"])
-    initial_dir = os.getcwd()
     serving = False
-    server = make_server(config)
+    live_reload = LiveReload()
+    server = make_server(config, live_reload)
+    resident = empty_resident_site(config)
 
     for changed in changed_files(source, destination, config):
         if serving:
             info(f"Changed {len(changed)} files, regenerating...")
-            server.shutdown()
-            os.chdir(initial_dir)
         try:
-            if full_build_required(changed, config) or not serving:
-                build(config)
-            else:
-                build_delta(changed, config)
+            update_resident_site(resident, changed)
+            site = resident_site(resident)
+            changed_paths = publish_served_site(site, server, changed)
+            if serving:
+                live_reload.notify(changed_urls(changed_paths, config))
         except KeyboardInterrupt:
             raise
         except Exception as e:
             exception(e, bool(config.get("trace")))
-        os.chdir(destination)
-        log_serving(config)
-        thread = Thread(target=server.serve_forever)
-        thread.daemon = True
-        thread.start()
         if not serving:
+            log_serving(config)
+            from threading import Thread
+
+            _serving = True
+            thread = Thread(target=server.serve_forever)
+            thread.daemon = True
+            thread.start()
             serving = True
 
 
+def daemon_socket_path(config: Config) -> str:
+    path = config.get("socket")
+    if path:
+        return path
+    return os.path.join(cache_directory(config), "daemon.sock")
+
+
+def daemon(config: Config) -> None:
+    """Build the site on requests from a Unix socket keeping it in memory.
+
+    Each connection sends a JSON request and gets a JSON response, each on a
+    single line. Plugins are loaded once and the site is kept in memory
+    between builds, only the source files changed since the previous build are
+    reloaded and patched in the site, see `update_resident_site()`.
+
+    Requests are `{"command": "build"}`, optionally with `"clean": true` to
+    ignore the build cache, and `{"command": "stop"}`. Build responses list
+    the reloaded sources, the changed outputs and the timings of the build, or
+    the error. Builds fail after changes of `_config.yml` or plugins until the
+    daemon is restarted, since they are only loaded at startup. Clients
+    that don't send a request in `DAEMON_TIMEOUT` seconds are disconnected.
+    """
+    import socket
+
+    if not hasattr(socket, "AF_UNIX"):
+        raise Exception("Unix sockets are not supported on this platform")
+    path = daemon_socket_path(config)
+    if os.path.exists(path):
+        with contextlib.suppress(OSError):
+            daemon_request(path, {"command": "ping"})
+            raise Exception(f"Daemon is already running at '{path}'")
+        os.remove(path)
+    make_dirs(os.path.dirname(os.path.abspath(path)))
+    resident = empty_resident_site(config)
+    stats: dict[str, tuple[int, int]] = {}
+    startup = startup_digests(config)
+    if not config.get("safe"):
+        startup["_plugins"] = _plugins_digest
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+        server.bind(path)
+        try:
+            server.listen()
+            info(f"Listening at {path}")
+            running = True
+            while running:
+                conn, _ = server.accept()
+                conn.settimeout(DAEMON_TIMEOUT)
+                with conn, conn.makefile("rb") as fd:
+                    try:
+                        line = fd.readline()
+                    except OSError as e:
+                        info(f"Dropped a connection: {e}")
+                        continue
+                    try:
+                        request = json.loads(line)
+                        if not isinstance(request, dict):
+                            raise ValueError("Request is not a JSON object")
+                        response = daemon_response(
+                            request, config, resident, stats, startup
+                        )
+                    except ValueError as e:
+                        request, response = {}, {"ok": False, "error": str(e)}
+                    data = json.dumps(response).encode(PAGE_ENCODING) + b"\n"
+                    with contextlib.suppress(OSError):
+                        conn.sendall(data)
+                running = request.get("command") != "stop"
+        finally:
+            os.remove(path)
+
+
+def daemon_response(
+    request: dict[str, Any],
+    config: Config,
+    resident: ResidentSite,
+    stats: dict[str, tuple[int, int]],
+    startup: dict[str, bytes],
+) -> dict[str, Any]:
+    """Handle a daemon request, update the resident site for builds.
+
+    The `startup` digests of the files loaded at startup are compared with the
+    current ones, see `startup_digests()`.
+    """
+    command = request.get("command")
+    if command in ("ping", "stop"):
+        return {"ok": True}
+    elif command != "build":
+        return {"ok": False, "error": f"Unknown command: {command!r}"}
+    current = startup_digests(config)
+    stale = [name for name, digest in startup.items() if current[name] != digest]
+    if stale:
+        names = ", ".join(stale)
+        return {"ok": False, "error": f"Changed {names}, restart the daemon"}
+    source = os.path.abspath(config["source"])
+    destination = os.path.abspath(config["destination"])
+    t0 = perf_counter()
+    try:
+        changed = scan_changed_files(source, destination, config, stats)
+        update_resident_site(resident, changed)
+        t1 = perf_counter()
+        site = resident_site(resident)
+        site["time"] = datetime.utcnow()
+        if request.get("clean"):
+            site["clean"] = True
+        outputs = publish_site(site)
+    except Exception as e:
+        exception(e, bool(config.get("trace")))
+        resident.update(empty_resident_site(config))
+        stats.clear()
+        return {"ok": False, "error": str(e), "timings": {"total": perf_counter() - t0}}
+    t2 = perf_counter()
+    return {
+        "ok": True,
+        "sources": sorted(os.path.relpath(path, source) for path in changed),
+        "changed": sorted(outputs),
+        "timings": {"load": t1 - t0, "generate": t2 - t1, "total": t2 - t0},
+    }
+
+
+def startup_digests(config: Config) -> dict[str, bytes]:
+    """Return digests of `_config.yml` and plugins, unless in safe mode."""
+    source = config["source"]
+    digests = {"_config.yml": file_digest(os.path.join(source, "_config.yml"))}
+    if not config.get("safe"):
+        digests["_plugins"] = plugins_digest(plugin_sources(source))
+    return digests
+
+
+def daemon_request(path: str, request: dict[str, Any]) -> dict[str, Any]:
+    """Send a request to the daemon listening at the socket path."""
+    import socket
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(path)
+        client.sendall(json.dumps(request).encode(PAGE_ENCODING) + b"\n")
+        with client.makefile("rb") as fd:
+            line = fd.readline()
+    if not line:
+        raise Exception(f"No response from the daemon at '{path}'")
+    return json.loads(line)
+
+
+def build_with_daemon(path: str, clean: bool) -> None:
+    response = daemon_request(path, {"command": "build", "clean": clean})
+    if not response["ok"]:
+        raise Exception(response["error"])
+    sources, changed = response["sources"], response["changed"]
+    total = response["timings"]["total"]
+    info(f"Reloaded {len(sources)} sources, changed {len(changed)} files")
+    info(f"Site generated successfully in {total:.3f} s")
+
+
 def log_serving(config: Config) -> None:
     url = "http://{host}:{port}{baseurl}".format(**config)
     if not url.endswith("/"):
@@ -720,16 +3279,6 @@ def log_serving(config: Config) -> None:
     info(f"Serving at {url}")
 
 
-def full_build_required(changed_paths: Iterable[str], config: Config) -> bool:
-    patterns = config.get("full_build_patterns", [])
-    source = os.path.abspath(config["source"])
-    for path in changed_paths:
-        parts = os.path.relpath(path, source).split(os.path.sep)
-        if any(re.match(pattern, part) for pattern in patterns for part in parts):
-            return True
-    return False
-
-
 def new_site(path: str) -> None:
     if os.path.exists(path) and os.listdir(path):
         raise Exception(f"Path '{path}' exists and is not empty")
@@ -743,6 +3292,8 @@ def new_site(path: str) -> None:
 
 
 def obraz(argv: list[str]) -> None:
+    from docopt import docopt
+
     opts = docopt(__doc__ or "", argv=argv, version="0.9.5")
     global _quiet
     _quiet = opts["--quiet"]
@@ -751,6 +3302,9 @@ def obraz(argv: list[str]) -> None:
         if opts["new"]:
             new_site(opts["PATH"])
             return
+        if opts["build"] and opts["--socket"]:
+            build_with_daemon(opts["--socket"], bool(opts["--clean"]))
+            return
 
         copy = cast(dict, DEFAULT_CONFIG.copy())
         source = opts["--source"] if opts["--source"] else "./"
@@ -759,22 +3313,29 @@ def obraz(argv: list[str]) -> None:
         copy["time"] = datetime.utcnow()
         for k, v in opts.items():
             if k.startswith("--") and v:
-                copy[k[2:]] = v
+                copy[k[2:].replace("-", "_")] = v
         config = cast(Config, copy)
 
         info(f'Source: {os.path.abspath(config["source"])}')
         info(f'Destination: {os.path.abspath(config["destination"])}')
 
-        if not config.get("safe"):
-            load_plugins(source)
+        if opts["--profile"] or opts["--profile-output"]:
+            start_profile()
+        try:
+            if not config.get("safe"):
+                load_plugins(source)
 
-        if opts["build"]:
-            build(config)
-        elif opts["serve"]:
-            if opts["--watch"]:
-                watch(config)
-            else:
-                serve(config)
+            if opts["build"]:
+                build(config)
+            elif opts["daemon"]:
+                daemon(config)
+            elif opts["serve"]:
+                if opts["--watch"]:
+                    watch(config)
+                else:
+                    serve(config)
+        finally:
+            finish_profile(config)
     except KeyboardInterrupt:
         info("Interrupted")
     except BaseException as e:
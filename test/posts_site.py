@@ -0,0 +1,33 @@
+import importlib
+import os
+import shutil
+import tempfile
+import unittest
+
+import obraz
+
+
+class PostsSiteTestCase(unittest.TestCase):
+    def setUp(self):
+        importlib.reload(obraz)
+        testdir = os.path.dirname(__file__)
+        src = os.path.join(testdir, "data", "posts", "src")
+        self.tempdir = tempfile.mkdtemp()
+        self.source = os.path.join(self.tempdir, "source")
+        shutil.copytree(src, self.source)
+        self.cwd = os.getcwd()
+        os.chdir(self.source)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tempdir)
+
+    def build(self, *args):
+        obraz.obraz(["build", "-q", "-t"] + list(args))
+
+    def output_times(self):
+        times = {}
+        destination = os.path.join(self.source, "_site")
+        for path in obraz.all_source_files(destination, "/nonexistent"):
+            times[os.path.relpath(path, destination)] = os.stat(path).st_mtime_ns
+        return times
@@ -0,0 +1,64 @@
+import os
+from typing import cast
+
+import obraz
+
+from .posts_site import PostsSiteTestCase
+
+
+class AtomicBuildTest(PostsSiteTestCase):
+    def test_atomic_builds(self):
+        destination = os.path.join(self.source, "_site")
+        generations = os.path.join(self.source, "._site.generations")
+        index = os.path.join(destination, "index.html")
+        self.build()
+        self.build("--atomic")
+        self.assertTrue(os.path.islink(destination))
+        self.assertEqual(len(os.listdir(generations)), 2)
+        before = os.stat(index)
+
+        with open(os.path.join(self.source, "index.html"), "a") as fd:
+            fd.write("<p>Changed</p>\n")
+        self.build("--atomic")
+        self.assertEqual(len(os.listdir(generations)), 2)
+        with open(index) as fd:
+            self.assertIn("<p>Changed</p>", fd.read())
+        test_3 = os.path.join(destination, "2012", "05", "24", "test-3.html")
+        self.assertEqual(os.stat(test_3).st_nlink, 2)
+        self.assertNotEqual(os.stat(index).st_ino, before.st_ino)
+
+        self.build("--atomic", "--keep=0")
+        self.assertEqual(len(os.listdir(generations)), 1)
+        self.assertEqual(os.stat(test_3).st_nlink, 1)
+
+    def publish_served_site(self, atomic):
+        config = cast(obraz.Config, dict(obraz.DEFAULT_CONFIG, quiet=True, port="0"))
+        config["atomic"] = atomic
+        obraz._quiet = True
+        server = obraz.make_server(config, None)
+        self.addCleanup(server.server_close)
+        index = os.path.join(self.source, "index.html")
+        directories = []
+        for _ in range(2):
+            with open(index, "a") as fd:
+                fd.write("<p>Changed</p>\n")
+            paths = obraz.all_source_files(".", config["destination"], config)
+            loaded = obraz.load_source_files(paths, config)
+            site = obraz.assemble_site(loaded.values(), config)
+            obraz.publish_served_site(site, server, [index])
+            directories.append(server.directory)
+            with open(os.path.join(server.directory, "index.html")) as fd:
+                self.assertEqual(fd.read().count("<p>Changed</p>"), len(directories))
+        return directories
+
+    def test_publish_served_site_atomic(self):
+        directories = self.publish_served_site(atomic=True)
+        self.assertNotEqual(directories[0], directories[1])
+        self.assertTrue(os.path.isdir(directories[0]))
+        self.assertEqual(os.path.realpath("_site"), directories[1])
+
+    def test_publish_served_site_in_place(self):
+        directories = self.publish_served_site(atomic=False)
+        self.assertEqual(directories, [os.path.abspath("_site")] * 2)
+        self.assertFalse(os.path.islink("_site"))
+        self.assertFalse(os.path.exists("._site.generations"))
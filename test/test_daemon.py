@@ -0,0 +1,97 @@
+import os
+import socket
+import threading
+import time
+
+import obraz
+
+from .posts_site import PostsSiteTestCase
+
+
+class DaemonTest(PostsSiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.socket = os.path.join(self.tempdir, "daemon.sock")
+        config = dict(obraz.DEFAULT_CONFIG, quiet=True, socket=self.socket)
+        obraz._quiet = True
+        obraz.DAEMON_TIMEOUT = 0.5
+        self.thread = threading.Thread(target=obraz.daemon, args=(config,))
+        self.thread.start()
+        while True:
+            try:
+                obraz.daemon_request(self.socket, {"command": "ping"})
+                break
+            except OSError:
+                time.sleep(0.01)
+
+    def tearDown(self):
+        obraz.daemon_request(self.socket, {"command": "stop"})
+        self.thread.join()
+        super().tearDown()
+
+    def request(self, **request):
+        return obraz.daemon_request(self.socket, dict(request, command="build"))
+
+    def test_idle_client(self):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(self.socket)
+            self.assertTrue(self.request()["ok"])
+            self.assertEqual(client.recv(1), b"")
+
+    def test_build_requests(self):
+        response = self.request()
+        self.assertTrue(response["ok"])
+        self.assertIn("index.html", response["changed"])
+        self.assertEqual(self.request()["changed"], [])
+
+        post = os.path.join("2012", "_posts", "2012-05-22-test-1.md")
+        with open(post, "a") as fd:
+            fd.write("Changed\n")
+        response = self.request()
+        self.assertEqual(response["sources"], [post])
+        self.assertIn(
+            os.path.join("2012", "05", "22", "test-1.html"), response["changed"]
+        )
+        self.assertEqual(set(response["timings"]), {"load", "generate", "total"})
+
+        before = self.output_times()
+        obraz.obraz(["build", "-q", "--socket", self.socket])
+        self.assertEqual(self.output_times(), before)
+
+    def test_error_response(self):
+        with open("index.html", "a") as fd:
+            fd.write("{% if %}\n")
+        response = self.request()
+        self.assertFalse(response["ok"])
+        self.assertIn("index.html", response["error"])
+        with self.assertRaises(Exception):
+            obraz.obraz(["build", "-q", "--socket", self.socket])
+
+    def test_templates_stay_compiled(self):
+        os.mkdir("_includes")
+        footer = os.path.join("_includes", "footer.html")
+        with open(footer, "w") as fd:
+            fd.write("<footer>1</footer>")
+        with open("index.html", "a") as fd:
+            fd.write('{% include "footer.html" %}\n')
+        self.assertTrue(self.request()["ok"])
+        templates = dict(obraz._jinja2_templates)
+        self.assertTrue(templates)
+        with open(footer, "w") as fd:
+            fd.write("<footer>2</footer>")
+        self.assertEqual(self.request()["changed"], ["index.html"])
+        with open(os.path.join("_site", "index.html")) as fd:
+            self.assertIn("<footer>2</footer>", fd.read())
+        for key, template in templates.items():
+            self.assertIs(obraz._jinja2_templates[key], template)
+
+    def test_startup_files_need_restart(self):
+        self.assertTrue(self.request()["ok"])
+        for name in ["_config.yml", os.path.join("_plugins", "a.py")]:
+            os.makedirs(os.path.dirname(name) or ".", exist_ok=True)
+            with open(name, "w") as fd:
+                fd.write("")
+            response = self.request()
+            self.assertFalse(response["ok"])
+            self.assertIn("restart", response["error"])
+            self.assertFalse(self.request()["ok"])
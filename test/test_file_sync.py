@@ -0,0 +1,57 @@
+import os
+import shutil
+from typing import cast
+
+import obraz
+
+from .posts_site import PostsSiteTestCase
+
+
+class FileSyncTest(PostsSiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.image = os.path.join(self.source, "image.png")
+        with open(self.image, "wb") as fd:
+            fd.write(b"\x89PNG" * 1024)
+        self.output = os.path.join(self.source, "_site", "image.png")
+
+    def test_unchanged_file_is_kept_by_clean_build(self):
+        self.build()
+        before = os.stat(self.output)
+        stale = os.path.join(self.source, "_site", "stale", "stale.html")
+        os.makedirs(os.path.dirname(stale))
+        with open(stale, "w") as fd:
+            fd.write("stale")
+        self.build("--clean")
+        after = os.stat(self.output)
+        self.assertEqual(after.st_ino, before.st_ino)
+        self.assertEqual(after.st_mtime_ns, os.stat(self.image).st_mtime_ns)
+        self.assertFalse(os.path.exists(os.path.dirname(stale)))
+
+    def test_changed_file_is_copied(self):
+        self.build()
+        with open(self.image, "ab") as fd:
+            fd.write(b"changed")
+        self.build()
+        with open(self.output, "rb") as fd:
+            self.assertTrue(fd.read().endswith(b"changed"))
+
+    def test_strategies(self):
+        for strategy in obraz.FILE_SYNC_STRATEGIES:
+            dst = os.path.join(self.tempdir, strategy)
+            config = cast(obraz.Config, dict(obraz.DEFAULT_CONFIG, file_sync=strategy))
+            self.assertTrue(obraz.sync_file(self.image, dst, config))
+            self.assertFalse(obraz.sync_file(self.image, dst, config))
+            with open(dst, "rb") as fd:
+                self.assertEqual(fd.read(), b"\x89PNG" * 1024)
+        hardlink = os.path.join(self.tempdir, "hardlink")
+        self.assertTrue(os.path.samefile(hardlink, self.image))
+
+    def test_hash(self):
+        dst = os.path.join(self.tempdir, "copy.png")
+        shutil.copyfile(self.image, dst)
+        os.utime(dst, (0, 0))
+        config = cast(obraz.Config, obraz.DEFAULT_CONFIG.copy())
+        self.assertFalse(obraz.same_file_contents(self.image, dst, config))
+        config["file_sync_hash"] = True
+        self.assertTrue(obraz.same_file_contents(self.image, dst, config))
@@ -0,0 +1,226 @@
+import importlib
+import os
+import shutil
+from typing import cast
+
+import obraz
+
+from .posts_site import PostsSiteTestCase
+
+
+class IncrementalBuildTest(PostsSiteTestCase):
+    def test_unchanged_site_is_not_rewritten(self):
+        self.build()
+        before = self.output_times()
+        self.build()
+        self.assertEqual(self.output_times(), before)
+
+    def test_changed_page_is_rewritten(self):
+        self.build()
+        with open(os.path.join(self.source, "index.html"), "a") as fd:
+            fd.write("<p>Changed</p>\n")
+        self.build()
+        with open(os.path.join(self.source, "_site", "index.html")) as fd:
+            self.assertIn("<p>Changed</p>", fd.read())
+
+    def test_removed_post_is_pruned(self):
+        self.build()
+        os.remove(os.path.join(self.source, "2012", "_posts", "2012-05-22-test-1.md"))
+        self.build()
+        times = self.output_times()
+        self.assertNotIn(os.path.join("2012", "05", "22", "test-1.html"), times)
+        self.assertIn(os.path.join("2012", "05", "23", "test-2.html"), times)
+
+    def test_removed_post_is_pruned_in_clean_build(self):
+        self.build()
+        os.remove(os.path.join(self.source, "2012", "_posts", "2012-05-22-test-1.md"))
+        self.build("--clean")
+        times = self.output_times()
+        self.assertNotIn(os.path.join("2012", "05", "22", "test-1.html"), times)
+
+    def test_unwritable_cache_directory(self):
+        with open(os.path.join(self.source, obraz.CACHE_DIR), "w") as fd:
+            fd.write("")
+        self.build()
+        index = os.path.join(self.source, "_site", "index.html")
+        with open(index) as fd:
+            self.assertIn("My Blog", fd.read())
+        os.remove(os.path.join(self.source, "2012", "_posts", "2012-05-22-test-1.md"))
+        self.build("--low-memory")
+        times = self.output_times()
+        self.assertNotIn(os.path.join("2012", "05", "22", "test-1.html"), times)
+        self.assertIn("index.html", times)
+
+    def test_new_post_rewrites_only_dependent_pages(self):
+        self.build()
+        before = self.output_times()
+        post = os.path.join(self.source, "2012", "_posts", "2012-05-30-test-0.md")
+        with open(post, "w") as fd:
+            fd.write("---\nlayout: post\ntitle: Test 0\n---\nTest 0\n")
+        self.build()
+        after = self.output_times()
+        self.assertIn(os.path.join("2012", "05", "30", "test-0.html"), after)
+        self.assertNotEqual(after["index.html"], before["index.html"])
+        test_3 = os.path.join("2012", "05", "24", "test-3.html")
+        self.assertEqual(after[test_3], before[test_3])
+
+    def test_changed_layout_rewrites_only_its_pages(self):
+        self.build()
+        before = self.output_times()
+        with open(os.path.join(self.source, "_layouts", "post.html"), "a") as fd:
+            fd.write("<footer></footer>\n")
+        self.build()
+        after = self.output_times()
+        self.assertEqual(after["index.html"], before["index.html"])
+        test_3 = os.path.join("2012", "05", "24", "test-3.html")
+        self.assertNotEqual(after[test_3], before[test_3])
+
+    def test_clean_build_keeps_unchanged_outputs(self):
+        self.build()
+        before = self.output_times()
+        index = os.path.join(self.source, "_site", "index.html")
+        with open(index, "a") as fd:
+            fd.write("<p>Changed</p>\n")
+        self.build("--clean")
+        after = self.output_times()
+        self.assertNotEqual(after["index.html"], before["index.html"])
+        with open(index) as fd:
+            self.assertNotIn("<p>Changed</p>", fd.read())
+        test_3 = os.path.join("2012", "05", "24", "test-3.html")
+        self.assertEqual(after[test_3], before[test_3])
+
+    def test_generator_outputs_are_kept(self):
+        plugins = os.path.join(self.source, "_plugins")
+        os.mkdir(plugins)
+        with open(os.path.join(plugins, "extra.py"), "w") as fd:
+            fd.write(
+                "import obraz\n\n\n"
+                "@obraz.generator\n"
+                "def generate_extra(site):\n"
+                "    obraz.write_file('extra.css', b'body {}', site)\n"
+            )
+        for args in [[], ["--clean"], ["--clean"], []]:
+            self.build(*args)
+            self.assertIn("extra.css", self.output_times())
+
+    def test_cache_keys_use_loaded_plugins(self):
+        os.mkdir("_plugins")
+        plugin = os.path.join("_plugins", "version.py")
+        with open("version.html", "w") as fd:
+            fd.write("---\n---\n{{ 'v' | version }}\n")
+
+        def write_plugin(version):
+            with open(plugin, "w") as fd:
+                fd.write(
+                    "import obraz\n\n\n"
+                    "@obraz.template_filter('version')\n"
+                    "def version(s, config):\n"
+                    f"    return s + '{version}'\n"
+                )
+
+        def output():
+            with open(os.path.join("_site", "version.html")) as fd:
+                return fd.read()
+
+        write_plugin(1)
+        self.build()
+        self.assertEqual(output(), "v1")
+        write_plugin(2)
+        config = cast(obraz.Config, dict(obraz.DEFAULT_CONFIG, quiet=True))
+        obraz.publish_site(obraz.load_site(config))
+        self.assertEqual(output(), "v1")
+        importlib.reload(obraz)
+        self.build()
+        self.assertEqual(output(), "v2")
+
+
+class ResidentSiteTest(PostsSiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.config = cast(
+            obraz.Config, dict(obraz.DEFAULT_CONFIG, quiet=True, trace=True)
+        )
+        obraz._quiet = True
+        self.resident = obraz.empty_resident_site(self.config)
+        self.posts = os.path.join(self.source, "2012", "_posts")
+
+    maxDiff = None
+
+    def generate(self, *paths):
+        obraz.update_resident_site(self.resident, paths)
+        site = obraz.resident_site(self.resident)
+        obraz.generate_site(site)
+        loaded = self.resident["loaded"].values()
+        contents = [obraz.copy_site_contents(data) for data in loaded]
+        expected = obraz.assemble_site(contents, self.config)
+        obraz.process_posts(expected)
+        self.assertEqual(self.outline(site), self.outline(expected))
+        resident = self.output_files()
+        self.build("--clean")
+        self.assertEqual(resident, self.output_files())
+
+    def write_post(self, name, front_matter):
+        path = os.path.join(self.posts, name)
+        with open(path, "w") as fd:
+            fd.write(f"---\nlayout: post\n{front_matter}---\n{name}\n")
+        return path
+
+    def test_update_source_files(self):
+        self.generate()
+        new_post = self.write_post("2012-05-25-test-4.md", "title: Test 4\n")
+        old_post = os.path.join(self.posts, "2012-05-22-test-1.md")
+        os.remove(old_post)
+        self.generate(new_post, old_post)
+
+    def test_patched_entries(self):
+        self.generate()
+        site = self.resident["site"]
+        assert site is not None
+        kept = site["posts"][1]
+        digest = self.resident["digests"][id(kept)]
+
+        moved = self.write_post(
+            "2012-05-24-test-3.md", "date: 2012-05-21 10:00:00\ntags: [tag 0, tag 2]\n"
+        )
+        self.generate(moved)
+        self.assertIs(self.resident["site"], site)
+        self.assertIs(site["posts"][0], kept)
+        self.assertIs(self.resident["digests"][id(kept)], digest)
+
+        added = self.write_post("2012-05-26-test-5.md", "tags: [tag 2, tag 3]\n")
+        self.generate(added)
+        self.assertIs(self.resident["site"], site)
+
+        shutil.rmtree(self.posts)
+        self.generate(self.posts)
+        self.assertEqual(site["posts"], [])
+        self.assertNotIn("tag 1", site["tags"])
+
+    def test_changed_layout(self):
+        self.generate()
+        with open(os.path.join(self.source, "_layouts", "post.html"), "a") as fd:
+            fd.write("Changed\n")
+        self.generate(os.path.join(self.source, "_layouts", "post.html"))
+
+    def outline(self, site):
+        def url(post):
+            return post["url"] if post else None
+
+        return {
+            "posts": [
+                (url(p), url(p.get("previous")), url(p.get("next")))
+                for p in site["posts"]
+            ],
+            "pages": [p["url"] for p in site.get("pages", [])],
+            "files": [f["url"] for f in site.get("files", [])],
+            "tags": [
+                (t, [p["url"] for p in ps]) for t, ps in site.get("tags", {}).items()
+            ],
+        }
+
+    def output_files(self):
+        files = {}
+        for path in self.output_times():
+            with open(os.path.join(self.source, "_site", path)) as fd:
+                files[path] = fd.read()
+        return files
@@ -0,0 +1,41 @@
+import os
+import shutil
+import tempfile
+from typing import cast
+from unittest import TestCase
+
+from obraz import Config, load_layouts
+
+
+class LayoutsTest(TestCase):
+    def setUp(self):
+        self.source = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.source, "_layouts"))
+
+    def tearDown(self):
+        shutil.rmtree(self.source)
+
+    def write_layout(self, name, text):
+        with open(os.path.join(self.source, "_layouts", name), "w") as fd:
+            fd.write(text)
+
+    def test_chain(self):
+        self.write_layout("base.html", "---\n---\n<html>{{ content }}</html>\n")
+        self.write_layout("post.html", "---\nlayout: base\n---\n<p>{{ content }}</p>\n")
+        layouts = load_layouts(cast(Config, {"source": self.source}))
+        chain = [t["content"] for t in layouts["post"]["chain"]]
+        self.assertEqual(
+            chain, ["<p>{{ content }}</p>\n", "<html>{{ content }}</html>\n"]
+        )
+
+    def test_missing_parent(self):
+        self.write_layout("post.html", "---\nlayout: base\n---\n")
+        self.assertRaises(
+            Exception, lambda: load_layouts(cast(Config, {"source": self.source}))
+        )
+
+    def test_cycle(self):
+        self.write_layout("a.html", "---\nlayout: b\n---\n")
+        self.write_layout("b.html", "---\nlayout: a\n---\n")
+        with self.assertRaisesRegex(Exception, "Cyclic"):
+            load_layouts(cast(Config, {"source": self.source}))
@@ -0,0 +1,40 @@
+import os
+import shutil
+from typing import cast
+
+import obraz
+
+from .posts_site import PostsSiteTestCase
+
+
+class LowMemoryTest(PostsSiteTestCase):
+    def setUp(self):
+        super().setUp()
+        with open(os.path.join(self.source, "excerpts.html"), "w") as fd:
+            fd.write(
+                "---\n---\n{% for post in site.posts %}"
+                "{{ post.content | truncate(20) }}\n{% endfor %}"
+            )
+
+    def outputs(self):
+        destination = os.path.join(self.source, "_site")
+        contents = {}
+        for path in self.output_times():
+            with open(os.path.join(destination, path), "rb") as fd:
+                contents[path] = fd.read()
+        return contents
+
+    def test_low_memory_output_matches_build(self):
+        self.build("--clean")
+        expected = self.outputs()
+        shutil.rmtree(os.path.join(self.source, "_site"))
+        self.build("--clean", "--low-memory")
+        self.assertEqual(self.outputs(), expected)
+        self.build("--low-memory")
+        self.assertEqual(self.outputs(), expected)
+
+    def test_lazy_content_is_read_on_access(self):
+        path = os.path.join("2012", "_posts", "2012-05-22-test-1.md")
+        page = cast(dict, obraz.read_template(path, lazy=True))
+        self.assertIsInstance(dict.__getitem__(page, "content"), obraz.LazyContent)
+        self.assertEqual({k: page[k] for k in page}, obraz.read_template(path))
@@ -0,0 +1,29 @@
+import imp
+from unittest import TestCase
+
+import obraz
+
+
+class MarkdownFilterTest(TestCase):
+    def setUp(self):
+        imp.reload(obraz)
+
+    def test_cached(self):
+        html = obraz.markdown_filter("*Hello*", {})
+        self.assertEqual(html, "<p><em>Hello</em></p>")
+        self.assertIs(obraz.markdown_filter("*Hello*", {}), html)
+        self.assertEqual(len(obraz._markdown_html), 1)
+
+    def test_converter_reset(self):
+        text = "Text[^1]\n\n[^1]: Note\n"
+        config = {"markdown_extensions": ["footnotes"]}
+        html = obraz.markdown_filter(text, config)
+        obraz._markdown_html.clear()
+        self.assertEqual(obraz.markdown_filter(text, config), html)
+        self.assertEqual(html.count("fn:1"), 2)
+
+    def test_extensions(self):
+        text = "a | b\n--|--\n1 | 2\n"
+        self.assertNotIn("<table>", obraz.markdown_filter(text, {}))
+        config = {"markdown_extensions": ["tables"]}
+        self.assertIn("<table>", obraz.markdown_filter(text, config))
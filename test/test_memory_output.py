@@ -0,0 +1,39 @@
+import os
+from typing import Union, cast
+
+import obraz
+
+from .posts_site import PostsSiteTestCase
+
+
+class MemoryOutputTest(PostsSiteTestCase):
+    def test_memory_output_matches_build(self):
+        config = cast(obraz.Config, dict(obraz.DEFAULT_CONFIG, quiet=True, trace=True))
+        obraz._quiet = True
+        files: dict[str, Union[bytes, str]] = {}
+        obraz.generate_site(obraz.load_site(config), output=files)
+        self.assertFalse(os.path.exists(os.path.join(self.source, "_site")))
+
+        self.build()
+        destination = os.path.join(self.source, "_site")
+        for path in self.output_times():
+            if path == ".obraz_destination":
+                continue
+            with open(os.path.join(destination, path), "rb") as fd:
+                data = fd.read()
+            self.assertEqual(files.pop(obraz.memory_key(path)), data)
+        self.assertEqual(files, {})
+
+    def test_changed_outputs(self):
+        config = cast(obraz.Config, dict(obraz.DEFAULT_CONFIG, quiet=True, trace=True))
+        obraz._quiet = True
+        old: dict[str, Union[bytes, str]] = {}
+        obraz.generate_site(obraz.load_site(config), output=old)
+        post = os.path.join(self.source, "2012", "_posts", "2012-05-22-test-1.md")
+        os.remove(post)
+        new: dict[str, Union[bytes, str]] = {}
+        obraz.generate_site(obraz.load_site(config), output=new)
+        changed = obraz.changed_outputs(old, new, [post])
+        self.assertIn("index.html", changed)
+        self.assertIn(os.path.join("2012", "05", "22", "test-1.html"), changed)
+        self.assertNotIn(os.path.join("2012", "05", "23", "test-2.html"), changed)
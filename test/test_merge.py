@@ -1,6 +1,6 @@
 from __future__ import unicode_literals
 from unittest import TestCase
-from obraz import merge
+from obraz import merge, merge_into
 
 
 class MergeTest(TestCase):
@@ -36,3 +36,23 @@ class MergeTest(TestCase):
     def test_merge_not_equal(self):
         self.assertRaises(ValueError, lambda: merge(1, 2))
         self.assertRaises(ValueError, lambda: merge(1, "foo"))
+
+
+class MergeIntoTest(TestCase):
+    def test_merge_into_nested(self):
+        acc: dict = {}
+        merge_into(acc, {"a": [1, 2], "c": {"k1": ["v1"]}})
+        merge_into(acc, {"a": [3, 4], "z": [5, 6], "c": {"k1": ["v2"], "k2": 1}})
+        merge_into(acc, {"c": {"k2": 1}})
+        res = {"a": [1, 2, 3, 4], "z": [5, 6], "c": {"k1": ["v1", "v2"], "k2": 1}}
+        self.assertEqual(acc, res)
+
+    def test_merge_into_does_not_modify_arguments(self):
+        x1 = {"a": [1], "b": {"c": [2]}}
+        acc: dict = {}
+        merge_into(acc, x1)
+        merge_into(acc, {"a": [3], "b": {"c": [4]}})
+        self.assertEqual(x1, {"a": [1], "b": {"c": [2]}})
+
+    def test_merge_into_not_equal(self):
+        self.assertRaises(ValueError, lambda: merge_into({"a": 1}, {"a": 2}))
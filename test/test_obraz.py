@@ -16,18 +16,23 @@ class ObrazTest(unittest.TestCase):
         testdir = os.path.dirname(__file__)
         self.datadir = os.path.join(testdir, "data")
 
-    def do(self, name, extra_args=()):
+    def do(self, name, extra_args=(), rebuilds=()):
         src = os.path.join(self.datadir, name, "src")
         site = os.path.join(self.datadir, name, "site")
         tempdir = tempfile.mkdtemp()
+        cwd = os.getcwd()
         try:
             source = os.path.join(tempdir, "source")
             shutil.copytree(src, source)
             os.chdir(source)
             obraz.obraz(["build", "-q", "-t"] + list(extra_args))
+            for args in rebuilds:
+                imp.reload(obraz)
+                obraz.obraz(["build", "-q", "-t"] + list(args))
             destination = os.path.join(source, "_site")
             self.assert_directories_equal(site, destination)
         finally:
+            os.chdir(cwd)
             shutil.rmtree(tempdir)
 
     def assert_directories_equal(self, expected, actual):
@@ -56,6 +61,9 @@ class ObrazTest(unittest.TestCase):
     def test_plugins(self):
         self.do("plugins")
 
+    def test_plugins_clean_rebuild(self):
+        self.do("plugins", rebuilds=[["--clean"]])
+
     def test_filters_after_rendering(self):
         """Issue #9."""
         self.do("filters_after_rendering")
@@ -75,6 +83,10 @@ class ObrazTest(unittest.TestCase):
     def test_raw_content(self):
         self.do("raw_content")
 
+    def test_parallel_pages(self):
+        self.do("posts", ["--jobs", "3"])
+        self.do("plugins", ["--jobs", "2"])
+
     def test_new(self):
         expected = os.path.join(self.datadir, "new")
         tempdir = tempfile.mkdtemp()
@@ -0,0 +1,42 @@
+import os
+from typing import cast
+
+import obraz
+
+from .posts_site import PostsSiteTestCase
+
+
+class ParallelLoadingTest(PostsSiteTestCase):
+    def load(self, jobs):
+        site = obraz.load_site(
+            cast(obraz.Config, dict(obraz.DEFAULT_CONFIG, jobs=jobs))
+        )
+        del site["jobs"]
+        return site
+
+    def test_parallel_loading_matches_serial(self):
+        self.assertEqual(self.load(3), self.load(1))
+
+    def test_no_workers_while_serving(self):
+        config = cast(obraz.Config, dict(obraz.DEFAULT_CONFIG, jobs=3))
+        self.assertEqual(obraz.jobs_count(config), 3)
+        obraz._serving = True
+        self.assertEqual(obraz.jobs_count(config), 1)
+
+    def test_loaders_run_in_order(self):
+        calls = []
+
+        @obraz.loader
+        def load_in_main_process(path, config):
+            calls.append((path, os.getpid()))
+            return None
+
+        @obraz.loader(parallel=True)
+        def load_in_worker(path, config):
+            return None
+
+        self.assertEqual(obraz.parallel_loaders_count(), 1)
+        self.assertEqual(self.load(2), self.load(1))
+        paths = [path for path, _ in calls]
+        self.assertEqual(paths[: len(paths) // 2], paths[len(paths) // 2 :])
+        self.assertEqual({pid for _, pid in calls}, {os.getpid()})
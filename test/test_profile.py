@@ -0,0 +1,22 @@
+import json
+import os
+
+from .posts_site import PostsSiteTestCase
+
+
+class ProfileTest(PostsSiteTestCase):
+    def test_profile_output(self):
+        output = os.path.join(self.tempdir, "profile.json")
+        self.build("--profile-output=" + output)
+        with open(output) as fd:
+            data = json.load(fd)
+        steps = {(t["cat"], t["name"]) for t in data["summary"]}
+        self.assertIn(("loader", "load_post"), steps)
+        self.assertIn(("generator", "Generate pages with YAML front matter"), steps)
+        self.assertIn(("page", "index.html"), steps)
+        self.assertIn(("layout", "default"), steps)
+
+        self.build("--clean", "--profile-output=" + output, "--profile-format=chrome")
+        with open(output) as fd:
+            events = json.load(fd)["traceEvents"]
+        self.assertTrue(all(e["ph"] == "X" for e in events))
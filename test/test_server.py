@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from typing import Optional, Union, cast
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import obraz
+
+
+class ServerTest(unittest.TestCase):
+    live_reload: Optional[obraz.LiveReload] = None
+    origin = False
+    memory = False
+
+    def setUp(self):
+        os.chdir(os.path.dirname(__file__))
+        self.destination = tempfile.mkdtemp()
+        with open(os.path.join(self.destination, "index.html"), "w") as fd:
+            fd.write("<p>Index</p>\n")
+        config = cast(
+            obraz.Config, dict(obraz.DEFAULT_CONFIG, port="0", baseurl="/blog")
+        )
+        config["origin"] = self.origin
+        config["memory"] = self.memory
+        config["destination"] = self.destination
+        self.config = config
+        self.server = obraz.make_server(config, self.live_reload)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        host, port = cast(tuple[str, int], self.server.server_address[:2])
+        self.url = f"http://{host}:{port}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        shutil.rmtree(self.destination)
+
+    def get(self, path):
+        with urlopen(self.url + path) as response:
+            return response.read()
+
+    def test_serves_destination_without_chdir(self):
+        cwd = os.getcwd()
+        self.assertEqual(self.get("/blog/"), b"<p>Index</p>\n")
+        self.assertEqual(os.getcwd(), cwd)
+
+    def test_outside_baseurl(self):
+        with self.assertRaises(Exception):
+            self.get("/index.html")
+
+
+class LiveReloadServerTest(ServerTest):
+    live_reload = obraz.LiveReload()
+
+    def test_serves_destination_without_chdir(self):
+        body = self.get("/blog/")
+        self.assertTrue(body.startswith(b"<p>Index</p>\n<script>"))
+        self.assertIn(obraz.LIVE_RELOAD_PATH.encode(), body)
+
+    def test_events(self):
+        urls = obraz.changed_urls(["index.html", "css/main.css"], self.config)
+        self.assertEqual(urls, ["/blog/index.html", "/blog/", "/blog/css/main.css"])
+        with urlopen(self.url + obraz.LIVE_RELOAD_PATH) as response:
+            self.assertEqual(response.headers["Content-Type"], "text/event-stream")
+            self.live_reload.notify(urls)
+            self.assertEqual(
+                response.readline().decode().strip(), "data: " + json.dumps(urls)
+            )
+
+
+class OriginServerTest(ServerTest):
+    origin = True
+
+    def request(self, path, **headers):
+        try:
+            with urlopen(Request(self.url + path, headers=headers)) as response:
+                return response.status, response.headers, response.read()
+        except HTTPError as e:
+            return e.code, e.headers, e.read()
+
+    def test_etag(self):
+        status, headers, body = self.request("/blog/index.html")
+        self.assertEqual(status, 200)
+        self.assertEqual(body, b"<p>Index</p>\n")
+        etag = headers["ETag"]
+        self.assertEqual(etag, f'"{hashlib.sha1(body).hexdigest()}"')
+        status, _, body = self.request("/blog/", **{"If-None-Match": etag})
+        self.assertEqual((status, body), (304, b""))
+        status, _, _ = self.request("/blog/", **{"If-None-Match": '"other"'})
+        self.assertEqual(status, 200)
+
+    def test_if_modified_since(self):
+        _, headers, _ = self.request("/blog/")
+        since = headers["Last-Modified"]
+        status, _, _ = self.request("/blog/", **{"If-Modified-Since": since})
+        self.assertEqual(status, 304)
+
+    def test_range(self):
+        status, headers, body = self.request("/blog/", Range="bytes=3-7")
+        self.assertEqual((status, body), (206, b"Index"))
+        self.assertEqual(headers["Content-Range"], "bytes 3-7/13")
+        status, _, body = self.request("/blog/", Range="bytes=-5")
+        self.assertEqual((status, body), (206, b"</p>\n"))
+        status, headers, _ = self.request("/blog/", Range="bytes=20-")
+        self.assertEqual(status, 416)
+        self.assertEqual(headers["Content-Range"], "bytes */13")
+        status, _, body = self.request(
+            "/blog/", Range="bytes=3-7", **{"If-Range": '"other"'}
+        )
+        self.assertEqual((status, body), (200, b"<p>Index</p>\n"))
+
+
+class MemoryServerTest(ServerTest):
+    memory = True
+
+    def setUp(self):
+        super().setUp()
+        self.server.directory = "/nonexistent"
+        self.server.files = {
+            "/index.html": b"<p>Index</p>\n",
+            "/about/index.html": b"<p>About</p>\n",
+            "/robots.txt": os.path.join(self.destination, "index.html"),
+        }
+
+    def test_memory_files(self):
+        self.assertEqual(self.get("/blog/about/"), b"<p>About</p>\n")
+        self.assertEqual(self.get("/blog/about"), b"<p>About</p>\n")
+        self.assertEqual(self.get("/blog/robots.txt"), b"<p>Index</p>\n")
+        with self.assertRaises(HTTPError):
+            self.get("/blog/missing.html")
+
+    def test_quoted_names(self):
+        files: dict[str, Union[bytes, str]] = {}
+        obraz._memory_output = files
+        try:
+            obraz.write_file("a b.html", b"<p>A B</p>\n", self.config)
+            obraz.copy_file(
+                os.path.join(self.destination, "index.html"),
+                os.path.join("dir", "\u0444\u0430\u0439\u043b.txt"),
+                self.config,
+            )
+        finally:
+            obraz._memory_output = None
+        self.server.files = files
+        self.assertEqual(self.get("/blog/a%20b.html"), b"<p>A B</p>\n")
+        url = "/blog/dir/" + obraz.pathname2url("\u0444\u0430\u0439\u043b.txt")
+        self.assertEqual(self.get(url), b"<p>Index</p>\n")
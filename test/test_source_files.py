@@ -0,0 +1,100 @@
+import os
+import shutil
+import tempfile
+import unittest
+from typing import cast
+
+import obraz
+
+
+class AllSourceFilesTest(unittest.TestCase):
+    def setUp(self):
+        self.source = tempfile.mkdtemp()
+        for path in [
+            "a.txt",
+            "dir1/b.txt",
+            ".git/objects/c",
+            "node_modules/pkg/d.js",
+            ".well-known/security.txt",
+            "_site/index.html",
+            ".obraz_cache/build.json",
+            "._site.generations/1/index.html",
+        ]:
+            full_path = os.path.join(self.source, *path.split("/"))
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            with open(full_path, "w") as fd:
+                fd.write(path)
+
+    def tearDown(self):
+        shutil.rmtree(self.source)
+
+    def files(self, config=None):
+        destination = os.path.join(self.source, "_site")
+        paths = obraz.all_source_files(self.source, destination, config)
+        return sorted(os.path.relpath(p, self.source) for p in paths)
+
+    def test_destination_is_skipped(self):
+        self.assertNotIn(os.path.join("_site", "index.html"), self.files())
+        self.assertIn(os.path.join(".git", "objects", "c"), self.files())
+
+    def test_build_directories_are_skipped(self):
+        config = dict(obraz.DEFAULT_CONFIG, exclude_patterns=["^_.*"])
+        self.assertNotIn(os.path.join(".obraz_cache", "build.json"), self.files(config))
+        generation = os.path.join("._site.generations", "1", "index.html")
+        self.assertNotIn(generation, self.files(config))
+
+    def test_excluded_directories_are_pruned(self):
+        config = cast(obraz.Config, obraz.DEFAULT_CONFIG.copy())
+        config["exclude"] = ["node_modules"]
+        config["include"] = [os.path.join(".well-known", "security.txt")]
+        expected = [
+            os.path.join(".well-known", "security.txt"),
+            "a.txt",
+            os.path.join("dir1", "b.txt"),
+        ]
+        self.assertEqual(self.files(config), expected)
+
+
+class ClassifyPathTest(unittest.TestCase):
+    def classify(self, path):
+        config = cast(obraz.Config, obraz.DEFAULT_CONFIG.copy())
+        return obraz.classify_path(path.replace("/", os.path.sep), config)
+
+    def test_classify(self):
+        self.assertEqual(self.classify("blog/_posts/2020-01-02-a.md"), obraz.PATH_POST)
+        self.assertEqual(self.classify("_posts/not-a-post.md"), obraz.PATH_UNDERSCORED)
+        self.assertEqual(self.classify("_drafts/a.md"), obraz.PATH_DRAFT)
+        self.assertEqual(self.classify("_config.yml"), obraz.PATH_UNDERSCORED)
+        self.assertEqual(self.classify("dir/index.md"), obraz.PATH_PAGE)
+        self.assertEqual(self.classify("dir/.hidden"), obraz.PATH_HIDDEN)
+        self.assertEqual(self.classify(".htaccess"), obraz.PATH_PAGE)
+
+
+class ReadTemplateTest(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def read(self, data):
+        path = os.path.join(self.tempdir, "page.md")
+        with open(path, "wb") as fd:
+            fd.write(data)
+        return obraz.read_template(path)
+
+    def test_front_matter(self):
+        page = self.read(b"---\ntitle: Test\n---\nHello\n---\n")
+        self.assertEqual(page, {"title": "Test", "content": "Hello\n---\n"})
+
+    def test_empty_front_matter(self):
+        self.assertEqual(self.read(b"---\n---\n"), {"content": ""})
+
+    def test_crlf_delimiters(self):
+        page = self.read(b"---\r\ntitle: Test\r\n---\r\nHello\r\n")
+        self.assertEqual(page, {"title": "Test", "content": "Hello\r\n"})
+
+    def test_no_front_matter(self):
+        self.assertIsNone(self.read(b"Hello\n"))
+        self.assertIsNone(self.read(b"---\ntitle: Test\n"))
+        self.assertIsNone(self.read(b"---\ntitle: Test\n---"))
@@ -0,0 +1,58 @@
+import os
+import subprocess
+import sys
+import unittest
+
+HEAVY_MODULES = [
+    "docopt",
+    "http.server",
+    "jinja2",
+    "markdown",
+    "multiprocessing",
+    "threading",
+    "yaml",
+]
+
+REGISTER_PLUGIN = """
+import obraz
+
+@obraz.loader
+def load_nothing(path, config):
+    return None
+
+@obraz.processor
+def process_nothing(site):
+    pass
+
+@obraz.template_filter("nothing")
+def nothing_filter(s, config):
+    return s
+"""
+
+
+class ImportTimeTest(unittest.TestCase):
+    def imported_modules(self, code):
+        root = os.path.join(os.path.dirname(__file__), "..")
+        env = dict(os.environ, PYTHONPATH=os.path.abspath(root))
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            env=env,
+            stderr=subprocess.PIPE,
+            check=True,
+        )
+        modules = set()
+        for line in process.stderr.decode().splitlines():
+            if line.startswith("import time:") and "|" in line:
+                modules.add(line.rsplit("|", 1)[1].strip())
+        return modules
+
+    def test_import_defers_heavy_dependencies(self):
+        modules = self.imported_modules("import obraz")
+        self.assertIn("obraz", modules)
+        for name in HEAVY_MODULES:
+            self.assertNotIn(name, modules)
+
+    def test_plugin_registration_defers_heavy_dependencies(self):
+        modules = self.imported_modules(REGISTER_PLUGIN)
+        for name in HEAVY_MODULES:
+            self.assertNotIn(name, modules)
@@ -0,0 +1,61 @@
+import importlib
+import os
+import shutil
+import tempfile
+from typing import cast
+from unittest import TestCase
+
+import obraz
+
+
+class Jinja2TemplateTest(TestCase):
+    def setUp(self):
+        importlib.reload(obraz)
+        self.source = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.source, "_includes"))
+
+    def tearDown(self):
+        shutil.rmtree(self.source)
+
+    def config(self, **kwargs):
+        return cast(obraz.Config, dict(kwargs, source=self.source))
+
+    def render(self, string, config, **context):
+        return obraz.jinja2_render_string(string, context, config)
+
+    def test_compiled_once(self):
+        config = self.config()
+        template = obraz.jinja2_template("{{ 1 + 1 }}", config)
+        self.assertIs(obraz.jinja2_template("{{ 1 + 1 }}", config), template)
+        self.assertEqual(self.render("{{ 1 + 1 }}", config), "2")
+        self.assertEqual(len(obraz._jinja2_templates), 1)
+
+    def test_environment_per_source(self):
+        env = obraz.jinja2_environment(self.config())
+        template = obraz.jinja2_template("{{ 1 }}", self.config())
+        self.assertIs(obraz.jinja2_environment(self.config()), env)
+        self.assertIs(obraz.jinja2_template("{{ 1 }}", self.config()), template)
+
+        other = cast(obraz.Config, {"source": os.path.join(self.source, "_includes")})
+        self.assertIsNot(obraz.jinja2_environment(other), env)
+        self.assertEqual(len(obraz._jinja2_templates), 0)
+
+    def test_filters_get_current_config(self):
+        @obraz.template_filter("title")
+        def title(s, config):
+            return config["title"]
+
+        for value in ["A", "B"]:
+            config = self.config(title=value)
+            self.assertEqual(self.render("{{ s | title }}", config, s=""), value)
+
+    def test_changed_include(self):
+        path = os.path.join(self.source, "_includes", "a.html")
+        with open(path, "w") as fd:
+            fd.write("1")
+        self.assertEqual(self.render("{% include 'a.html' %}", self.config()), "1")
+        with open(path, "w") as fd:
+            fd.write("2")
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        self.assertEqual(self.render("{% include 'a.html' %}", self.config()), "2")
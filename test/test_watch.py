@@ -0,0 +1,102 @@
+import os
+import shutil
+import tempfile
+import unittest
+from typing import cast
+
+import obraz
+
+
+class ChangedFilesTest(unittest.TestCase):
+    def setUp(self):
+        self.source = tempfile.mkdtemp()
+        self.destination = os.path.join(self.source, "_site")
+        self.config = cast(obraz.Config, dict(obraz.DEFAULT_CONFIG, source=self.source))
+        with open(os.path.join(self.source, "a.txt"), "w") as fd:
+            fd.write("a")
+
+    def tearDown(self):
+        shutil.rmtree(self.source)
+
+    def check_changes(self, changes):
+        a = os.path.join(self.source, "a.txt")
+        b = os.path.join(self.source, "b.txt")
+        self.assertEqual(next(changes), [a])
+        os.rename(a, b)
+        with open(os.path.join(self.source, ".hidden"), "w") as fd:
+            fd.write("hidden")
+        self.assertEqual(sorted(next(changes)), [a, b])
+
+    def check_build_directories_are_ignored(self, changes):
+        a = os.path.join(self.source, "a.txt")
+        self.assertEqual(next(changes), [a])
+        for path in [
+            os.path.join(obraz.CACHE_DIR, "build.json"),
+            os.path.join("._site.generations", "1", "index.html"),
+            os.path.join("_site", "index.html"),
+        ]:
+            path = os.path.join(self.source, path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as fd:
+                fd.write("output")
+        with open(a, "w") as fd:
+            fd.write("changed")
+        self.assertEqual(next(changes), [a])
+
+    def check_atomic_builds_are_ignored(self, changes):
+        a = os.path.join(self.source, "a.txt")
+        self.assertEqual(next(changes), [a])
+        self.config["destination"] = self.destination
+        obraz._quiet = True
+        for _ in range(2):
+            obraz.generate_site_atomic(obraz.load_site(self.config))
+        with open(a, "w") as fd:
+            fd.write("changed")
+        self.assertEqual(next(changes), [a])
+
+    def test_poll(self):
+        changes = obraz.poll_changed_files(
+            self.source, self.destination, self.config, poll_interval=0
+        )
+        self.check_changes(iter(changes))
+
+    def test_inotify(self):
+        watch = obraz.inotify_watch(self.source, self.destination)
+        if not watch:
+            self.skipTest("inotify is not available")
+        changes = obraz.inotify_changed_files(
+            watch, self.source, self.destination, self.config
+        )
+        self.check_changes(iter(changes))
+
+    def test_poll_ignores_build_directories(self):
+        self.config["exclude_patterns"] = ["^_.*"]
+        changes = obraz.poll_changed_files(
+            self.source, self.destination, self.config, poll_interval=0
+        )
+        self.check_build_directories_are_ignored(iter(changes))
+
+    def test_inotify_ignores_build_directories(self):
+        self.config["exclude_patterns"] = ["^_.*"]
+        watch = obraz.inotify_watch(self.source, self.destination, self.config)
+        if not watch:
+            self.skipTest("inotify is not available")
+        changes = obraz.inotify_changed_files(
+            watch, self.source, self.destination, self.config
+        )
+        self.check_build_directories_are_ignored(iter(changes))
+
+    def test_poll_ignores_atomic_builds(self):
+        changes = obraz.poll_changed_files(
+            self.source, self.destination, self.config, poll_interval=0
+        )
+        self.check_atomic_builds_are_ignored(iter(changes))
+
+    def test_inotify_ignores_atomic_builds(self):
+        watch = obraz.inotify_watch(self.source, self.destination, self.config)
+        if not watch:
+            self.skipTest("inotify is not available")
+        changes = obraz.inotify_changed_files(
+            watch, self.source, self.destination, self.config
+        )
+        self.check_atomic_builds_are_ignored(iter(changes))